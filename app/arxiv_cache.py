@@ -0,0 +1,225 @@
+"""
+Persistent on-disk cache for raw arXiv API responses
+Stores gzip-compressed feeds keyed by normalized search parameters;
+unused entries expire and the least recently used are evicted to keep
+the directory under its size limit
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.query_utils import normalize_query
+
+
+@dataclass
+class CachedFeed:
+    body: bytes
+    fresh: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetch_seconds: float = 0.0
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ArxivCache:
+    def __init__(self, cache_dir: str, ttl: float, max_age: float = 7 * 86400,
+                 max_bytes: int = 200 * 1024 * 1024):
+        """
+        Initialize arXiv response cache
+
+        Args:
+            cache_dir: Directory holding cached feeds
+            ttl: Seconds an entry is served without revalidation
+            max_age: Seconds an entry is kept after its last use; stale
+                     entries are kept until then for revalidation
+            max_bytes: Total compressed feed size kept; least recently
+                       used entries are evicted beyond it
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'evicted': 0,
+            'bytes_saved': 0,
+            'fetch_seconds_saved': 0.0
+        }
+
+    def _key(self, params: Dict) -> str:
+        """Hash normalized search parameters into a cache key"""
+        normalized = dict(params)
+        query = normalized.get('search_query', '')
+        prefix, _, terms = query.partition(':')
+        normalized['search_query'] = f"{prefix}:{normalize_query(terms)}"
+        raw = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _paths(self, key: str):
+        return (
+            os.path.join(self.cache_dir, f"{key}.xml.gz"),
+            os.path.join(self.cache_dir, f"{key}.json")
+        )
+
+    def _count(self, name: str, body_size: int = 0, fetch_seconds: float = 0.0):
+        with self._lock:
+            self._stats[name] += 1
+            self._stats['bytes_saved'] += body_size
+            self._stats['fetch_seconds_saved'] += fetch_seconds
+
+    def get(self, params: Dict) -> Optional[CachedFeed]:
+        """
+        Look up a cached feed
+
+        Fresh entries count as hits. Stale entries are returned so the
+        caller can revalidate them; they only count once resolved.
+
+        Args:
+            params: arXiv query parameters
+
+        Returns:
+            CachedFeed, or None if nothing is cached
+        """
+        body_path, meta_path = self._paths(self._key(params))
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # The body's mtime records the last use for eviction
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+        cached = CachedFeed(
+            body=body,
+            fresh=time.time() - meta['stored_at'] < self.ttl,
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            fetch_seconds=meta.get('fetch_seconds', 0.0)
+        )
+        if cached.fresh:
+            self._count('hits', len(body), cached.fetch_seconds)
+        return cached
+
+    def put(self, params: Dict, body: bytes, headers: Dict, fetch_seconds: float):
+        """
+        Store a freshly fetched feed and evict expired or least recently
+        used ones
+
+        Args:
+            params: arXiv query parameters
+            body: Raw response body
+            headers: Response headers (for ETag / Last-Modified)
+            fetch_seconds: Time the upstream fetch took
+        """
+        self._count('misses')
+        self._write(params, body, {
+            'stored_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetch_seconds': fetch_seconds
+        })
+        self._prune()
+
+    def revalidated(self, params: Dict, cached: CachedFeed):
+        """
+        Mark a stale entry as still valid after a 304 response
+
+        Only the metadata is rewritten; the body was not transferred.
+        """
+        self._count('revalidated', len(cached.body))
+        self._write(params, None, {
+            'stored_at': time.time(),
+            'etag': cached.etag,
+            'last_modified': cached.last_modified,
+            'fetch_seconds': cached.fetch_seconds
+        })
+
+    def _write(self, params: Dict, body: Optional[bytes], meta: Dict):
+        """Atomically write body and metadata files"""
+        body_path, meta_path = self._paths(self._key(params))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if body is not None:
+                tmp = f"{body_path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp, body_path)
+            tmp = f"{meta_path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, meta_path)
+        except OSError as e:
+            print(f"Error writing arXiv cache: {e}")
+
+    def _prune(self):
+        """Delete entries unused for max_age, then the least recently used beyond max_bytes"""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".xml.gz"):
+                        info = entry.stat()
+                        entries.append((info.st_mtime, info.st_size, entry.name[:-len(".xml.gz")]))
+        except OSError as e:
+            print(f"Error pruning arXiv cache: {e}")
+            return
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for last_used, size, key in entries:
+            if last_used > now - self.max_age and total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error pruning arXiv cache: {e}")
+            total -= size
+            evicted += 1
+
+        if evicted:
+            with self._lock:
+                self._stats['evicted'] += evicted
+
+    def stats(self) -> Dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['revalidated']) / lookups, 3) if lookups else 0.0
+        stats['fetch_seconds_saved'] = round(stats['fetch_seconds_saved'], 2)
+        return stats
+
+
+# Shared by every job in the process
+arxiv_cache = ArxivCache(
+    cache_dir=os.getenv("ARXIV_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "data"), "arxiv_cache")),
+    ttl=float(os.getenv("ARXIV_CACHE_TTL", "3600")),
+    max_age=float(os.getenv("ARXIV_CACHE_MAX_AGE_HOURS", "168")) * 3600,
+    max_bytes=int(os.getenv("ARXIV_CACHE_MAX_MB", "200")) * 1024 * 1024
+)
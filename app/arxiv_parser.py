@@ -0,0 +1,193 @@
+"""
+Streaming parser for arXiv Atom feeds
+Yields papers as soon as each <entry> element is complete
+"""
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from xml.etree.ElementTree import XMLPullParser, Element
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+OPENSEARCH_NS = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+# Abstracts are capped to keep payloads small; report prompts trim
+# them sentence by sentence to a token budget (see context_packer)
+MAX_SUMMARY_CHARS = 2000
+
+
+def _text(elem: Optional[Element]) -> str:
+    """Return whitespace-normalized text of an element"""
+    if elem is None or elem.text is None:
+        return ""
+    return " ".join(elem.text.split())
+
+
+def _arxiv_id_from_url(url: str) -> str:
+    """Extract the arXiv identifier (with version) from an abs URL"""
+    if "/abs/" in url:
+        return url.split("/abs/", 1)[1]
+    return url.rsplit("/", 1)[-1]
+
+
+def canonical_arxiv_id(arxiv_id: str) -> str:
+    """Strip the version suffix, e.g. '2401.01234v2' -> '2401.01234'"""
+    return re.sub(r"v\d+$", "", arxiv_id)
+
+
+def paper_point_id(paper: Dict) -> str:
+    """
+    Deterministic Qdrant point ID for a paper
+
+    Derived from the version-stripped arXiv ID, so every version of a
+    paper maps to the same point. Falls back to the URL for papers
+    without an arXiv ID.
+
+    Args:
+        paper: Paper dict
+
+    Returns:
+        UUID string
+    """
+    if paper.get('arxiv_id'):
+        name = f"arxiv:{canonical_arxiv_id(paper['arxiv_id'])}"
+    else:
+        name = paper['url']
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+
+def published_timestamp(paper: Dict) -> Optional[float]:
+    """
+    Publication date as a UTC Unix timestamp, for numeric payload indexes
+
+    Args:
+        paper: Paper dict with 'published_date' as YYYY-MM-DD
+
+    Returns:
+        Seconds since the epoch, or None if the date is missing or malformed
+    """
+    try:
+        published = datetime.strptime(paper.get('published_date') or '', "%Y-%m-%d")
+    except ValueError:
+        return None
+    return published.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _entry_to_paper(entry: Element) -> Optional[Dict]:
+    """
+    Convert a parsed <entry> element to a paper dict
+
+    Args:
+        entry: Completed Atom entry element
+
+    Returns:
+        Paper dict, or None if required fields are missing
+    """
+    title = _text(entry.find(f"{ATOM_NS}title"))
+    summary = _text(entry.find(f"{ATOM_NS}summary"))
+    link = _text(entry.find(f"{ATOM_NS}id"))
+    published = _text(entry.find(f"{ATOM_NS}published"))
+
+    if not (title and summary and link and published):
+        return None
+
+    updated = _text(entry.find(f"{ATOM_NS}updated"))
+    authors = [
+        _text(author.find(f"{ATOM_NS}name"))
+        for author in entry.findall(f"{ATOM_NS}author")
+    ]
+    categories = [
+        cat.get("term")
+        for cat in entry.findall(f"{ATOM_NS}category")
+        if cat.get("term")
+    ]
+    primary = entry.find(f"{ARXIV_NS}primary_category")
+    primary_category = primary.get("term") if primary is not None else None
+
+    return {
+        'title': title,
+        'content': summary[:MAX_SUMMARY_CHARS],
+        'url': link,
+        'source': 'arXiv',
+        'published_date': published.split('T')[0],  # Format: YYYY-MM-DD
+        'updated_date': updated.split('T')[0] if updated else None,
+        'arxiv_id': _arxiv_id_from_url(link),
+        'authors': [name for name in authors if name],
+        'categories': categories,
+        'primary_category': primary_category or (categories[0] if categories else None)
+    }
+
+
+class ArxivFeedParser:
+    """
+    Push-style incremental parser for an arXiv Atom feed
+
+    Feed raw body chunks as they arrive; each call returns the papers
+    whose <entry> completed in that chunk.
+    """
+    ENTRY_TAG = f"{ATOM_NS}entry"
+    TOTAL_TAG = f"{OPENSEARCH_NS}totalResults"
+
+    def __init__(self, meta: Optional[Dict] = None):
+        """
+        Args:
+            meta: Optional dict that receives feed-level fields
+                  ('total_results') as they are parsed
+        """
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root: Optional[Element] = None
+        self.meta = meta if meta is not None else {}
+
+    def _drain(self) -> List[Dict]:
+        papers = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            if elem.tag == self.TOTAL_TAG:
+                self.meta['total_results'] = int(_text(elem) or 0)
+            if elem.tag != self.ENTRY_TAG:
+                continue
+            paper = _entry_to_paper(elem)
+            # Detach the entry from <feed> so memory stays flat on large
+            # feeds; clearing alone leaves an empty element per entry
+            try:
+                self._root.remove(elem)
+            except ValueError:
+                # Not a direct child of the root
+                elem.clear()
+            if paper:
+                papers.append(paper)
+        return papers
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Parse a chunk and return the papers it completed"""
+        if not chunk:
+            return []
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict]:
+        """Finish parsing and return any remaining papers"""
+        self._parser.close()
+        return self._drain()
+
+
+def parse_arxiv_feed(chunks: Iterable[bytes], meta: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Incrementally parse an arXiv Atom feed
+
+    Args:
+        chunks: Raw response body, e.g. response.iter_content()
+        meta: Optional dict that receives feed-level fields
+              ('total_results') as they are parsed
+
+    Yields:
+        Paper dicts in feed order, as each entry finishes
+    """
+    parser = ArxivFeedParser(meta)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
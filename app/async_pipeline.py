@@ -0,0 +1,796 @@
+"""
+Asynchronous research pipeline
+Runs the research stages (fetch, store, search, report) on the event
+loop: pooled keep-alive HTTP for arXiv and Groq, a shared
+AsyncQdrantClient (REST or gRPC), and embedding awaited from the
+embedding service or offloaded to a small bounded executor
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+
+from app.research_engine import ResearchEngine, LockedQdrant, REPORT_PROMPT_VERSION, REPORT_PROMPT_DOCS
+from app.arxiv_parser import ArxivFeedParser, parse_arxiv_feed, paper_point_id
+from app.arxiv_cache import arxiv_cache
+from app.rate_limiter import arxiv_limiter
+from app.single_flight import async_research_flight
+from app.query_utils import normalize_query, research_key, fetch_key
+from app.progress import progress_broker
+from app.groq_stream import ReportStream, cached_metrics, partial_report
+from app.report_cache import report_cache
+from app.semantic_cache import semantic_cache
+from app.local_retrieval import retrieval_stats
+from app.http_client import AsyncOutboundHTTP
+from app.llm_scheduler import groq_scheduler, estimate_tokens
+from app.map_reduce import (
+    MAP_TOKENS_PER_PAPER, map_note_cache,
+    group_papers, build_map_prompt, parse_map_notes, build_reduce_prompt
+)
+from app.paper_digests import (
+    DIGEST_VERSION, DIGEST_TOKENS_PER_PAPER, digest_store, paper_key, build_digest_prompt, parse_digests
+)
+
+# Embedding cache usage of the research run in progress, summed over
+# every embed call the run makes
+_embedding_usage: ContextVar[Optional[Dict]] = ContextVar('embedding_usage', default=None)
+
+
+class ThreadedQdrant:
+    """
+    Async facade over the engine's sync client, for local mode
+
+    Embedded storage can only be opened by one client per process, so
+    the pipeline shares the engine's client and runs its calls in threads.
+    The engine's LockedQdrant serializes them with the engine's own calls.
+    """
+
+    def __init__(self, client: LockedQdrant):
+        self.client = client
+
+    def __getattr__(self, name: str):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+    async def close(self):
+        """The engine owns the client"""
+
+
+class AsyncResearchPipeline:
+    def __init__(self, engine: ResearchEngine):
+        """
+        Initialize async pipeline on top of a configured engine
+
+        The engine supplies settings, the embedding model and the
+        CPU-side helpers (parsing, prompt building, result shaping).
+
+        Args:
+            engine: Initialized ResearchEngine
+        """
+        self.engine = engine
+
+        # One pooled client for arXiv, Groq and Resend
+        self.http = AsyncOutboundHTTP(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+        )
+
+        if engine.qdrant_mode == "local":
+            self.qdrant = ThreadedQdrant(engine.qdrant)
+        else:
+            self.qdrant = AsyncQdrantClient(**engine.qdrant_client_options())
+
+        # In-process embedding and local ranking are CPU-bound; a fixed
+        # pool keeps the thread count flat no matter how many jobs are in
+        # flight. The embedding service is awaited without a thread
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("EMBEDDING_EXECUTOR_WORKERS", "2")),
+            thread_name_prefix="embed"
+        )
+
+        # Background corpus writes under local retrieval
+        self._background: Set[asyncio.Task] = set()
+
+        # Concurrent map calls across jobs in map-reduce report mode
+        self._map_slots = asyncio.Semaphore(engine.map_concurrency)
+
+        # Generations in flight: the runs sharing each one and its text so far
+        self._generations: Dict[Tuple, Dict] = {}
+
+    async def _embed(self, texts: List[str]) -> List:
+        return await self.engine.encoder.embed_async(texts, _embedding_usage.get(), self.executor)
+
+    def _embedding_summary(self, usage: Dict) -> Dict:
+        """Embedding cache hit rate and time saved by one run"""
+        hits, embedded = usage.get('hits', 0), usage.get('embedded', 0)
+        return {
+            'hits': hits,
+            'embedded': embedded,
+            'hit_rate': round(hits / (hits + embedded), 3) if hits + embedded else 0.0,
+            'embed_seconds': round(usage.get('embed_seconds', 0.0), 3),
+            'seconds_saved': round(hits * self.engine.encoder.seconds_per_text(), 3)
+        }
+
+    async def _fetch_arxiv_page(self, query: str, start: int, size: int,
+                                meta: Optional[Dict] = None) -> List[Dict]:
+        """
+        Fetch and parse one page of arXiv results
+        Served from the disk cache when fresh; otherwise waits on the
+        shared rate limiter and fetches (or revalidates) upstream
+
+        Args:
+            query: Search term
+            start: Offset of the first result
+            size: Number of results in this page
+            meta: Optional dict that receives feed-level fields
+
+        Returns:
+            List of papers in feed order
+        """
+        params = self.engine._arxiv_params(query, start, size)
+
+        def parse_cached() -> List[Dict]:
+            return list(parse_arxiv_feed([cached.body], meta))
+
+        # Cache reads, revalidation writes and whole-feed parses run in
+        # threads so a cache hit does not stall other jobs on the loop
+        cached = await asyncio.to_thread(arxiv_cache.get, params)
+        if cached and cached.fresh:
+            return await asyncio.to_thread(parse_cached)
+
+        started = time.perf_counter()
+        async with self.http.stream(
+            "GET",
+            self.engine.arxiv_url,
+            params=params,
+            headers=cached.validators() if cached else None,
+            limiter=arxiv_limiter
+        ) as response:
+            # Stale entry confirmed unchanged by the upstream
+            if response.status_code == 304 and cached:
+                await asyncio.to_thread(arxiv_cache.revalidated, params, cached)
+                return await asyncio.to_thread(parse_cached)
+
+            response.raise_for_status()
+
+            # Parse entries as the body streams in, keeping the raw bytes
+            parser = ArxivFeedParser(meta)
+            body = []
+            papers = []
+            async for chunk in response.aiter_bytes():
+                body.append(chunk)
+                papers.extend(parser.feed(chunk))
+            papers.extend(parser.close())
+
+        await asyncio.to_thread(
+            arxiv_cache.put, params, b"".join(body), response.headers, time.perf_counter() - started
+        )
+        return papers
+
+    async def iter_arxiv_pages(self, query: str, max_results: int = 20) -> AsyncIterator[List[Dict]]:
+        """
+        Fetch arXiv results page by page
+        Following pages are requested a few ahead behind the shared rate
+        limiter and yielded in order
+
+        Args:
+            query: Search term
+            max_results: Maximum number of results across all pages
+
+        Yields:
+            Lists of papers, one per page
+        """
+        pages = self.engine._plan_arxiv_pages(max_results, self.engine.arxiv_page_size)
+        if not pages:
+            return
+
+        meta = {}
+        start, size = pages[0]
+        first = await self._fetch_arxiv_page(query, start, size, meta)
+        yield first
+
+        total = min(max_results, meta.get('total_results', max_results))
+        remaining = iter([(start, size) for start, size in pages[1:] if start < total])
+        if len(first) < size:
+            return
+
+        # Each task holds a limiter reservation while it waits, so only a
+        # few are scheduled: an early end leaves no long queue behind
+        tasks = deque()
+
+        def schedule():
+            while len(tasks) < self.engine.arxiv_page_lookahead:
+                page = next(remaining, None)
+                if page is None:
+                    return
+                start, size = page
+                tasks.append(asyncio.create_task(
+                    self._fetch_arxiv_page(query, start, min(size, total - start))
+                ))
+
+        schedule()
+        try:
+            while tasks:
+                page = await tasks.popleft()
+                # An empty page means arXiv ran out of results early
+                if not page:
+                    yield page
+                    break
+                schedule()
+                yield page
+        finally:
+            # Newest first, so each cancelled wait is the limiter's latest
+            # reservation and gets its slot back before anyone else reserves
+            for task in reversed(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def store_in_qdrant(self, documents: List[Dict]) -> int:
+        """
+        Embed and upsert documents not yet stored at the same version
+
+        Args:
+            documents: List of documents with title, content, URL, and date
+
+        Returns:
+            Number of documents embedded and stored
+
+        Raises:
+            Exception: Qdrant and embedding errors, so the job is retried
+        """
+        if not documents:
+            print("No documents to store")
+            return 0
+
+        print(f"Storing {len(documents)} documents in Qdrant...")
+
+        stored = await self.qdrant.retrieve(
+            collection_name="research_docs",
+            ids=list({paper_point_id(doc) for doc in documents}),
+            with_payload=['arxiv_id', 'url', 'published_ts'],
+            with_vectors=False
+        )
+        pending = self.engine._pending_documents(documents, stored)
+
+        if not pending:
+            print("All documents already stored")
+            return 0
+
+        texts = [f"{doc['title']} {doc['content']}" for doc in pending.values()]
+        embeddings = await self._embed(texts)
+        points = self.engine._build_points(pending, embeddings)
+
+        await self.qdrant.upsert(collection_name="research_docs", points=points)
+        print(f"{len(points)} documents stored successfully "
+              f"({len(documents) - len(points)} already stored)")
+        return len(points)
+
+    async def search_relevant_docs(self, query: str, top_k: int = 12,
+                                   filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Search relevant documents using semantic similarity
+
+        Args:
+            query: User search query
+            top_k: Number of results to return
+            filters: Optional date range, category and source filters
+
+        Returns:
+            List of most relevant recent documents
+        """
+        print(f"Searching relevant documents for: '{query}'")
+
+        try:
+            started = time.perf_counter()
+            query_embedding = (await self._embed([query]))[0]
+
+            response = await self.qdrant.query_points(
+                **self.engine._recency_query(query_embedding.tolist(), top_k, filters)
+            )
+
+            retrieval_stats.record_search('qdrant', time.perf_counter() - started)
+            return self.engine._format_hits(response.points)
+
+        except Exception as e:
+            print(f"Error in semantic search: {e}")
+            return []
+
+    async def rank_fetched(self, query: str, papers: List[Dict], top_k: int = 12,
+                           filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Rank a job's fetched papers in process
+        Same scoring as the Qdrant search, restricted to these papers;
+        their embeddings come from the embedding cache
+
+        Args:
+            query: User search query
+            papers: Papers fetched for this job
+            top_k: Number of results to return
+            filters: Optional date range, category and source filters
+
+        Returns:
+            List of most relevant recent documents
+        """
+        started = time.perf_counter()
+        vectors = await self._embed([query] + [f"{doc['title']} {doc['content']}" for doc in papers])
+        ranked = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.engine._rank_fetched, vectors[0], papers, vectors[1:], top_k, filters
+        )
+        retrieval_stats.record_search('local', time.perf_counter() - started)
+        return ranked
+
+    async def _store_in_background(self, documents: List[Dict]):
+        """Corpus write taken off the critical path by local retrieval"""
+        started = time.perf_counter()
+        try:
+            await self.store_in_qdrant(documents)
+        except Exception as e:
+            # The job ranks its own papers, so a failed write only
+            # leaves them out of the corpus
+            print(f"Error storing in Qdrant: {e}")
+            return
+        retrieval_stats.record_background_store(time.perf_counter() - started)
+
+    async def generate_report(self, query: str, documents: List[Dict],
+                              on_text: Optional[Callable[[str], None]] = None,
+                              priority: int = 0) -> str:
+        """
+        Generate research report using Groq API
+
+        Args:
+            query: Research question
+            documents: List of relevant documents
+            on_text: Called with each piece of the report as it streams in
+            priority: Higher priorities get Groq capacity first
+
+        Returns:
+            Report in text format
+        """
+        return (await self._generate_report(query, documents, on_text, priority))[0]
+
+    async def _generate_report(self, query: str, documents: List[Dict],
+                               on_text: Optional[Callable[[str], None]] = None,
+                               priority: int = 0) -> Tuple[str, Dict]:
+        """
+        Generate a report and measure the call
+
+        Returns:
+            Tuple of (report, generation metrics)
+        """
+        prompt, key = await self._report_prompt(query, documents, priority)
+
+        # Same query, same papers, same settings: reuse the report
+        cached = await asyncio.to_thread(report_cache.get, key)
+        if cached is not None:
+            print("Report served from cache")
+            if on_text:
+                on_text(cached)
+            return cached, cached_metrics()
+
+        print("Generating report with Groq API...")
+
+        cost = estimate_tokens(
+            prompt, self.engine._groq_payload("")['max_tokens'], self.engine.context_packer.count_tokens
+        )
+        stream = ReportStream(on_text)
+
+        try:
+            complete = self._stream_completion if self.engine.groq_stream else self._complete
+            # Wait for room in Groq's request and token budgets; a 429
+            # pauses the scheduler and the call queues again
+            for attempt in range(self.engine.groq_rate_limit_retries + 1):
+                await groq_scheduler.acquire_async(cost, priority)
+                started = time.perf_counter()
+                stream.restart()
+                report = await asyncio.wait_for(complete(prompt, stream), self.engine.groq_timeout)
+                if stream.status_code != 429:
+                    break
+                print("Groq rate limit reached, waiting for capacity")
+            if report is None:
+                return f"Error generating report: {stream.error}", self.engine._record_generation(stream)
+
+            print("Report generated successfully")
+            await asyncio.to_thread(report_cache.put, key, report, time.perf_counter() - started)
+            return report, self.engine._record_generation(stream)
+
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            print("Timeout generating report")
+            if stream.parts:
+                return partial_report(stream.text, "timeout"), self.engine._record_generation(stream)
+            stream.error = "timeout"
+            return "Error: AI service took too long to respond. Please try again.", self.engine._record_generation(stream)
+
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            if stream.parts:
+                return partial_report(stream.text, str(e)), self.engine._record_generation(stream)
+            stream.error = str(e)
+            return f"Error generating report: {str(e)}", self.engine._record_generation(stream)
+
+    async def _report_prompt(self, query: str, documents: List[Dict], priority: int) -> Tuple[str, str]:
+        """
+        Build the report prompt and its report cache key
+
+        Returns:
+            Tuple of (prompt, cache key)
+        """
+        if self.engine._uses_map_reduce(documents):
+            notes = await self._map_notes(query, documents, priority)
+            if notes:
+                return build_reduce_prompt(query, notes), self.engine._reduce_key(query, notes)
+            print("Map step produced no notes, falling back to a single prompt")
+
+        template_version = REPORT_PROMPT_VERSION
+        if self.engine.report_context == "digest":
+            documents = await self._with_digests(documents, priority)
+            template_version = ('digest', REPORT_PROMPT_VERSION, DIGEST_VERSION, self.engine.digest_mode)
+
+        # Fit the most relevant papers and sentences into the token budget
+        documents = self.engine.context_packer.pack(query, documents)
+        return (
+            self.engine._build_report_prompt(query, documents),
+            self.engine._report_key(query, documents, template_version)
+        )
+
+    async def _with_digests(self, documents: List[Dict], priority: int = 0) -> List[Dict]:
+        """
+        Prompt papers with their abstracts replaced by stored digests
+
+        Papers without a digest get one now: in llm mode from one batched
+        Groq call, otherwise (or if that call fails) extractively.
+        """
+        documents = documents[:REPORT_PROMPT_DOCS]
+        digests = await asyncio.to_thread(
+            digest_store.get_many, [paper_key(doc) for doc in documents], self.engine.digest_mode
+        )
+        missing = [doc for doc in documents if paper_key(doc) not in digests]
+        if missing and self.engine.digest_mode == "llm":
+            try:
+                text = await self._groq_complete(
+                    build_digest_prompt(missing), DIGEST_TOKENS_PER_PAPER * len(missing), priority
+                )
+                generated = parse_digests(text, missing)
+                await asyncio.to_thread(digest_store.put_many, generated, "llm")
+                digests.update(generated)
+            except Exception as e:
+                print(f"Digest generation failed for {len(missing)} papers: {e}")
+        return await asyncio.to_thread(self.engine._apply_digests, documents, digests)
+
+    async def _map_notes(self, query: str, documents: List[Dict], priority: int = 0) -> List[Tuple[int, Dict, str]]:
+        """
+        Map phase: one note per paper, from cache or from group completions
+
+        Groups run concurrently, bounded by the map slots; a failed group
+        only loses its own papers.
+
+        Returns:
+            (source number, paper, note) in source order
+        """
+        cached = await asyncio.to_thread(
+            lambda: [map_note_cache.get(self.engine._map_key(query, doc)) for doc in documents]
+        )
+        notes = {number: note for number, note in enumerate(cached, 1) if note is not None}
+        pending = [(number, doc) for number, doc in enumerate(documents, 1) if number not in notes]
+
+        groups = group_papers(pending, self.engine.map_group_size)
+        if groups:
+            print(f"Summarizing {len(pending)} papers in {len(groups)} groups "
+                  f"({len(notes)} notes from cache)")
+        for group_notes in await asyncio.gather(*(self._map_group(query, group, priority) for group in groups)):
+            notes.update(group_notes)
+
+        return [(number, documents[number - 1], notes[number]) for number in sorted(notes)]
+
+    async def _map_group(self, query: str, group: List[Tuple[int, Dict]], priority: int = 0) -> Dict[int, str]:
+        """Summarize one group of papers and cache each paper's note"""
+        async with self._map_slots:
+            started = time.perf_counter()
+            try:
+                text = await self._groq_complete(
+                    build_map_prompt(query, group), MAP_TOKENS_PER_PAPER * len(group), priority
+                )
+            except Exception as e:
+                print(f"Map step failed for {len(group)} papers: {e}")
+                return {}
+
+        notes = parse_map_notes(text, group)
+        seconds = (time.perf_counter() - started) / len(group)
+
+        def store():
+            for number, doc in group:
+                if number in notes:
+                    map_note_cache.put(self.engine._map_key(query, doc), notes[number], seconds)
+        await asyncio.to_thread(store)
+        return notes
+
+    async def _groq_complete(self, prompt: str, max_tokens: int, priority: int = 0) -> str:
+        """
+        Non-streamed completion admitted by the Groq scheduler
+
+        Raises:
+            httpx.HTTPError: If the call fails
+        """
+        cost = estimate_tokens(prompt, max_tokens, self.engine.context_packer.count_tokens)
+        for attempt in range(self.engine.groq_rate_limit_retries + 1):
+            await groq_scheduler.acquire_async(cost, priority)
+            response = await self.http.post(
+                self.engine.groq_url,
+                headers=self.engine._groq_headers(),
+                json=self.engine._groq_payload(prompt, max_tokens=max_tokens),
+                timeout=self.engine.groq_timeout
+            )
+            groq_scheduler.update(response.status_code, response.headers)
+            if response.status_code != 429:
+                break
+            print("Groq rate limit reached, waiting for capacity")
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def _groq_error(self, response: httpx.Response, stream: ReportStream):
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.text}")
+        try:
+            error_msg = response.json().get('error', {}).get('message')
+        except ValueError:
+            error_msg = None
+        stream.error = error_msg or f"HTTP Error {response.status_code}"
+        print(f"Error in Groq API request: {stream.error}")
+
+    async def _stream_completion(self, prompt: str, stream: ReportStream) -> Optional[str]:
+        """Consume the completion event stream; None on an HTTP error"""
+        async with self.http.stream(
+            "POST",
+            self.engine.groq_url,
+            headers=self.engine._groq_headers(),
+            json=self.engine._groq_payload(prompt, stream=True),
+            timeout=self.engine.groq_timeout
+        ) as response:
+            stream.status_code = response.status_code
+            groq_scheduler.update(response.status_code, response.headers)
+            if response.status_code != 200:
+                await response.aread()
+                self._groq_error(response, stream)
+                return None
+            async for line in response.aiter_lines():
+                if line and stream.feed_line(line):
+                    break
+        if not stream.finished:
+            raise httpx.RemoteProtocolError("stream ended before completion")
+        return stream.text
+
+    async def _complete(self, prompt: str, stream: ReportStream) -> Optional[str]:
+        """Single-response completion; None on an HTTP error"""
+        response = await self.http.post(
+            self.engine.groq_url,
+            headers=self.engine._groq_headers(),
+            json=self.engine._groq_payload(prompt),
+            timeout=self.engine.groq_timeout
+        )
+        stream.status_code = response.status_code
+        groq_scheduler.update(response.status_code, response.headers)
+        if response.status_code != 200:
+            self._groq_error(response, stream)
+            return None
+        data = response.json()
+        stream.parts.append(data['choices'][0]['message']['content'])
+        stream.record_usage(data.get('usage', {}))
+        stream.finish()
+        return stream.text
+
+    async def _fetch_and_store(self, query: str) -> List[Dict]:
+        """
+        Fetch papers page by page and store each page as it arrives
+        With local retrieval, pages are only embedded here and stored
+        in the background
+
+        Args:
+            query: Search term
+
+        Returns:
+            All fetched papers
+
+        Raises:
+            Exception: arXiv and Qdrant errors, so the job is retried
+                       rather than failed as a search without results
+        """
+        print(f"Searching papers in arXiv: '{query}'")
+        run_key = fetch_key(query)
+        papers = []
+        embedded = 0
+        async for page in self.iter_arxiv_pages(query, self.engine.arxiv_max_results):
+            papers.extend(page)
+            progress_broker.publish(run_key, 'papers', {
+                'page': len(page),
+                'total': len(papers)
+            })
+
+            if self.engine.retrieval_mode == "local":
+                await async_research_flight.do(
+                    ('embed-local', tuple(paper['url'] for paper in page)),
+                    self._embed, [f"{doc['title']} {doc['content']}" for doc in page]
+                )
+                embedded += len(page)
+                task = asyncio.create_task(self._store_in_background(page))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            else:
+                # Jobs that fetched the same page share one embedding pass
+                embedded += await async_research_flight.do(
+                    ('embed', tuple(paper['url'] for paper in page)),
+                    self.store_in_qdrant, page
+                )
+            progress_broker.publish(run_key, 'embedded', {
+                'embedded': embedded,
+                'stored': len(papers)
+            })
+
+        print(f"Found {len(papers)} papers")
+        return papers
+
+    async def _shared_generation(self, key: Tuple, run_key: str, query: str,
+                                 documents: List[Dict], priority: int) -> Tuple[str, Dict]:
+        """
+        Generate a report once for every concurrent run with the same key
+
+        Report text is forwarded to each run's jobs as it streams in; a run
+        joining a generation in progress first receives the text so far.
+
+        Returns:
+            Tuple of (report, generation metrics)
+        """
+        shared = self._generations.get(key)
+        if shared is None:
+            shared = self._generations[key] = {'runs': {run_key}, 'parts': []}
+        else:
+            shared['runs'].add(run_key)
+            if shared['parts']:
+                progress_broker.publish(run_key, 'report_delta', {'text': "".join(shared['parts'])})
+
+        def on_text(text: str):
+            shared['parts'].append(text)
+            for joined in list(shared['runs']):
+                progress_broker.publish(joined, 'report_delta', {'text': text})
+
+        async def generate() -> Tuple[str, Dict]:
+            try:
+                return await self._generate_report(query, documents, on_text, priority)
+            finally:
+                # Released with the flight, so later runs start afresh
+                del self._generations[key]
+
+        return await async_research_flight.do(key, generate)
+
+    async def run_full_research(self, query: str, filters: Optional[Dict] = None,
+                                priority: int = 0) -> Dict:
+        """
+        Execute complete research pipeline without blocking the event loop
+
+        Args:
+            query: User research question
+            filters: Optional search filters (see ResearchEngine._search_filter)
+            priority: Higher priorities get Groq capacity first
+
+        Returns:
+            Dict with report, sources, statistics and per-stage timings
+        """
+        print(f"\n{'='*60}")
+        print(f"STARTING RESEARCH: {query}")
+        print(f"{'='*60}\n")
+
+        # Identical concurrent jobs already share the whole run (see
+        # process_research_job); runs of the same query with other
+        # filters share the fetch, and the generation if the sources match
+        normalized = normalize_query(query)
+        run_key = research_key(query, filters)
+        timings = {}
+        started = time.perf_counter()
+        usage = {}
+        _embedding_usage.set(usage)
+
+        # Reworded repeats of a recent question reuse its sources and report;
+        # filtered runs are not shared
+        query_vector = (await self._embed([query]))[0]
+        hit = None
+        if not filters:
+            hit = await asyncio.to_thread(semantic_cache.lookup, normalized, query_vector)
+        timings['semantic_lookup'] = time.perf_counter() - started
+        if hit:
+            timings['total'] = time.perf_counter() - started
+            result = self.engine._semantic_result(hit, timings)
+            # This run's own usage rather than the past run's
+            result['embedding'] = self._embedding_summary(usage)
+            progress_broker.publish(run_key, 'search', {
+                'hits': result['relevant_papers'],
+                'sources': [
+                    {'title': doc['title'], 'url': doc['url'], 'published_date': doc['published_date']}
+                    for doc in result['sources']
+                ]
+            })
+            progress_broker.publish(run_key, 'report', {'report': result['report']})
+            return result
+
+        stage_start = time.perf_counter()
+        papers = await async_research_flight.do(
+            ('fetch', normalized, self.engine.arxiv_max_results),
+            self._fetch_and_store, query
+        )
+        timings['fetch'] = time.perf_counter() - stage_start
+
+        if not papers:
+            return {
+                'status': 'error',
+                'message': 'No papers found in arXiv',
+                'report': None,
+                'sources': [],
+                'timings': timings
+            }
+
+        stage_start = time.perf_counter()
+        if self.engine.retrieval_mode == "local":
+            relevant = await self.rank_fetched(query, papers, top_k=self.engine.report_top_k, filters=filters)
+        else:
+            relevant = await self.search_relevant_docs(query, top_k=self.engine.report_top_k, filters=filters)
+        timings['search'] = time.perf_counter() - stage_start
+        progress_broker.publish(run_key, 'search', {
+            'hits': len(relevant),
+            'sources': [
+                {'title': doc['title'], 'url': doc['url'], 'published_date': doc['published_date']}
+                for doc in relevant[:self.engine.report_sources]
+            ]
+        })
+
+        stage_start = time.perf_counter()
+        # Runs with other filters that retrieved the same papers share one
+        # Groq call; the query is part of the prompt, so it is keyed too
+        report, generation = await self._shared_generation(
+            ('generate', normalized, self.engine.groq_model,
+             tuple(doc.get('arxiv_id') or doc['url'] for doc in relevant)),
+            run_key, query, relevant, priority
+        )
+        timings['generate'] = time.perf_counter() - stage_start
+        timings['first_token'] = generation['first_token']
+        progress_broker.publish(run_key, 'report', {'report': report})
+        timings['total'] = time.perf_counter() - started
+
+        embedding = self._embedding_summary(usage)
+        print(f"Embedding cache: {embedding['hits']}/{embedding['hits'] + embedding['embedded']} hits, "
+              f"{embedding['embedded']} embedded in {embedding['embed_seconds']:.2f}s, "
+              f"~{embedding['seconds_saved']:.2f}s saved")
+
+        print(f"\n{'='*60}")
+        print("RESEARCH COMPLETED")
+        print(f"{'='*60}\n")
+
+        result = {
+            'status': 'success',
+            'report': report,
+            'sources': relevant[:self.engine.report_sources],
+            'total_papers': len(papers),
+            'relevant_papers': len(relevant),
+            'generation': generation,
+            'embedding': embedding,
+            'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        }
+        # Failed or partial reports are not worth reusing
+        if generation['complete'] and not filters:
+            await asyncio.to_thread(
+                semantic_cache.put, normalized, query_vector, result, timings['total']
+            )
+        return result
+
+    async def close(self):
+        """Finish background corpus writes, then release connections and the executor"""
+        if self._background:
+            await asyncio.wait(self._background, timeout=30)
+        await self.http.aclose()
+        await self.qdrant.close()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,139 @@
+"""
+Storage and index settings for the research_docs collection
+Quantization, on-disk vectors and HNSW parameters, with the matching
+search parameters and an in-place migration for existing collections
+"""
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, VectorParamsDiff, HnswConfigDiff, Disabled,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig,
+    SearchParams, QuantizationSearchParams
+)
+
+# bge-small-en-v1.5 output size
+VECTOR_SIZE = 384
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+
+@dataclass
+class CollectionConfig:
+    quantization: str = "none"
+    on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: Optional[int] = None
+    oversampling: float = 2.0
+    rescore: bool = True
+
+    def __post_init__(self):
+        if self.quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization '{self.quantization}', expected one of {QUANTIZATION_MODES}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "CollectionConfig":
+        """Settings from QDRANT_* environment variables"""
+        hnsw_ef = os.getenv("QDRANT_HNSW_EF")
+        return cls(
+            quantization=os.getenv("QDRANT_QUANTIZATION", "none").lower(),
+            on_disk=os.getenv("QDRANT_ON_DISK", "false").lower() == "true",
+            hnsw_m=int(os.getenv("QDRANT_HNSW_M", "16")),
+            hnsw_ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")),
+            hnsw_ef=int(hnsw_ef) if hnsw_ef else None,
+            oversampling=float(os.getenv("QDRANT_OVERSAMPLING", "2.0")),
+            rescore=os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+        )
+
+    def describe(self) -> Dict:
+        return asdict(self)
+
+    def vectors_config(self) -> VectorParams:
+        return VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=self.on_disk)
+
+    def hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self):
+        """
+        Quantized vectors stay in RAM even when the originals are on
+        disk, so HNSW traversal never touches the disk
+        """
+        if self.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=True
+            ))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[SearchParams]:
+        """
+        Search parameters for this configuration
+
+        With quantization, oversampling fetches extra candidates by
+        quantized score and rescore re-ranks them on the original vectors.
+        """
+        quantization = None
+        if self.quantization != "none":
+            quantization = QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def create(self, client: QdrantClient, collection_name: str):
+        """Create a collection with these settings"""
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self.vectors_config(),
+            hnsw_config=self.hnsw_config(),
+            quantization_config=self.quantization_config()
+        )
+
+    def migrate(self, client: QdrantClient, collection_name: str) -> bool:
+        """
+        Bring an existing collection to these settings in place
+
+        Qdrant rebuilds the affected index segments in the background;
+        the collection keeps serving searches meanwhile.
+
+        Returns:
+            True if the collection was changed
+        """
+        current = client.get_collection(collection_name).config
+        changes = {}
+
+        vectors = current.params.vectors
+        if bool(getattr(vectors, 'on_disk', None)) != self.on_disk:
+            changes['vectors_config'] = {"": VectorParamsDiff(on_disk=self.on_disk)}
+
+        hnsw = current.hnsw_config
+        if (hnsw.m, hnsw.ef_construct) != (self.hnsw_m, self.hnsw_ef_construct):
+            changes['hnsw_config'] = self.hnsw_config()
+
+        if _quantization_mode(current.quantization_config) != self.quantization:
+            changes['quantization_config'] = self.quantization_config() or Disabled.DISABLED
+
+        if not changes:
+            return False
+        print(f"Migrating collection '{collection_name}': {', '.join(changes)}")
+        client.update_collection(collection_name=collection_name, **changes)
+        return True
+
+
+def _quantization_mode(config) -> str:
+    if config is None:
+        return "none"
+    if getattr(config, 'scalar', None) is not None:
+        return "scalar"
+    if getattr(config, 'binary', None) is not None:
+        return "binary"
+    return "other"
@@ -0,0 +1,123 @@
+"""
+Token-budget-aware context packing for report prompts
+Counts tokens with a local tokenizer and fills the context budget with
+the most useful abstract sentences of the most relevant papers
+"""
+import re
+import heapq
+from typing import Dict, List, Optional
+
+# Sentence boundaries inside an abstract
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the "
+    "this to was were with we our their these those which recent advances progress "
+    "new using based study paper approach results".split()
+)
+
+
+def content_terms(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 2}
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+class ContextPacker:
+    def __init__(self, token_budget: int = 1200, max_docs: int = 6,
+                 tokenizer_name: Optional[str] = None):
+        """
+        Initialize context packer
+
+        Args:
+            token_budget: Tokens available for the paper context
+            max_docs: Most papers included in the prompt
+            tokenizer_name: Hugging Face tokenizer matching the Groq model;
+                            without it (or offline) tokens are estimated
+                            at four characters each
+        """
+        self.token_budget = token_budget
+        self.max_docs = max_docs
+        self.tokenizer = None
+        # Name of the tokenizer actually counting tokens, None when estimating
+        self.tokenizer_name = None
+        if tokenizer_name:
+            try:
+                # Installed with fastembed
+                from tokenizers import Tokenizer
+                self.tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+                self.tokenizer_name = tokenizer_name
+            except Exception as e:
+                print(f"Tokenizer '{tokenizer_name}' unavailable, estimating tokens: {e}")
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        return (len(text) + 3) // 4
+
+    def _overhead(self, index: int, doc: Dict) -> int:
+        """Tokens of a prompt entry apart from its abstract"""
+        return self.count_tokens(
+            f"[{index}] Title: {doc['title']}\n"
+            f"Published: {doc['published_date']}\n"
+            f"Abstract: \n"
+            f"URL: {doc['url']}\n"
+        )
+
+    def pack(self, query: str, documents: List[Dict]) -> List[Dict]:
+        """
+        Select papers and abstract sentences that fit the token budget
+
+        Papers are taken in relevance order and kept as a prefix, so
+        citation numbers match the source list. Every included paper
+        keeps its most useful sentence; remaining budget goes to the next
+        most useful sentences across papers, weighted by paper rank.
+        Sentences keep their original order within each abstract.
+
+        Args:
+            query: Research question
+            documents: Papers, most relevant first
+
+        Returns:
+            Copies of the included papers with 'content' trimmed
+        """
+        query_terms = content_terms(query)
+        budget = self.token_budget
+        included = []
+        candidates = []
+
+        for rank, doc in enumerate(documents[:self.max_docs]):
+            sentences = split_sentences(doc['content']) or [doc['content']]
+            scored = []
+            for position, sentence in enumerate(sentences):
+                overlap = len(query_terms & content_terms(sentence)) / len(query_terms) if query_terms else 0.0
+                # The opening sentence usually states the contribution
+                score = overlap + (0.5 if position == 0 else 0.0)
+                scored.append((score, position, sentence, self.count_tokens(sentence) + 1))
+
+            best = max(scored, key=lambda item: (item[0], -item[1]))
+            cost = self._overhead(rank + 1, doc) + best[3]
+            if cost > budget:
+                break
+            budget -= cost
+            included.append((doc, {best[1]: best[2]}))
+
+            weight = 1.0 / (1 + 0.25 * rank)
+            for score, position, sentence, tokens in scored:
+                if position != best[1]:
+                    heapq.heappush(candidates, (-score * weight, rank, position, sentence, tokens))
+
+        while candidates:
+            _, rank, position, sentence, tokens = heapq.heappop(candidates)
+            if rank < len(included) and tokens <= budget:
+                included[rank][1][position] = sentence
+                budget -= tokens
+
+        packed = []
+        for doc, kept in included:
+            trimmed = dict(doc)
+            trimmed['content'] = " ".join(kept[position] for position in sorted(kept))
+            packed.append(trimmed)
+        return packed
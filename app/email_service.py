@@ -3,34 +3,44 @@ Email service with Resend
 Includes publication dates in email
 """
 import os
-import requests
-from typing import List, Dict
+import re
+from typing import List, Dict, Optional
 
+from app.http_client import AsyncOutboundHTTP
 
-def send_research_report(to_email: str, query: str, report: str, sources: List[Dict]) -> bool:
+
+RESEND_URL = "https://api.resend.com/emails"
+# Sources always listed; later ones are listed when the report cites them
+LISTED_SOURCES = 6
+
+
+def _cited_numbers(report: str) -> set:
+    """Source numbers cited as [n] or [n, m] in the report"""
+    return {
+        int(number)
+        for group in re.findall(r"\[(\d+(?:\s*,\s*\d+)*)\]", report)
+        for number in group.split(",")
+    }
+
+
+def build_report_html(query: str, report: str, sources: List[Dict]) -> str:
     """
-    Send research report via email with publication dates
+    Render the report email body
     
     Args:
-        to_email: Recipient email
         query: Research query
         report: Generated report
         sources: List of sources with dates
         
     Returns:
-        True if email sent successfully
+        HTML document
     """
-    resend_api_key = os.getenv("RESEND_API_KEY")
-    
-    if not resend_api_key:
-        print("RESEND_API_KEY not configured")
-        return False
-    
-    print(f"Sending report to {to_email}...")
-    
     # Generate HTML with publication dates
     sources_html = ""
-    for i, src in enumerate(sources[:6], 1):
+    cited = _cited_numbers(report)
+    for i, src in enumerate(sources, 1):
+        if i > LISTED_SOURCES and i not in cited:
+            continue
         pub_date = src.get('published_date', 'Unknown date')
         sources_html += f"""
         <div style="margin-bottom: 15px; padding: 12px; background: #f9f9f9; border-left: 3px solid #667eea; border-radius: 4px;">
@@ -99,21 +109,62 @@ def send_research_report(to_email: str, query: str, report: str, sources: List[D
     </body>
     </html>
     """
+    return html_content
+
+
+def _resend_headers(api_key: str, idempotency_key: Optional[str]) -> Dict:
+    """Request headers; the idempotency key makes retried sends deliver once"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
+
+
+def _resend_payload(to_email: str, query: str, html_content: str) -> Dict:
+    return {
+        "from": "Research Automator <onboarding@resend.dev>",
+        "to": [to_email],
+        "subject": f"Research Report: {query[:60]}...",
+        "html": html_content
+    }
+
+
+async def send_research_report_async(client: AsyncOutboundHTTP, to_email: str, query: str,
+                                     report: str, sources: List[Dict],
+                                     idempotency_key: Optional[str] = None) -> bool:
+    """
+    Send research report via email on the event loop
+    
+    Args:
+        client: Shared async outbound client (pooled keep-alive connections)
+        to_email: Recipient email
+        query: Research query
+        report: Generated report
+        sources: List of sources with dates
+        idempotency_key: Resend deduplicates sends with the same key, so
+                         HTTP retries and job retries email once
+        
+    Returns:
+        True if email sent successfully
+    """
+    resend_api_key = os.getenv("RESEND_API_KEY")
+    
+    if not resend_api_key:
+        print("RESEND_API_KEY not configured")
+        return False
+    
+    print(f"Sending report to {to_email}...")
+    
+    html_content = build_report_html(query, report, sources)
     
     try:
-        response = requests.post(
-            "https://api.resend.com/emails",
-            headers={
-                "Authorization": f"Bearer {resend_api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "from": "Research Automator <onboarding@resend.dev>",
-                "to": [to_email],
-                "subject": f"Research Report: {query[:60]}...",
-                "html": html_content
-            },
-            timeout=10
+        response = await client.post(
+            RESEND_URL,
+            headers=_resend_headers(resend_api_key, idempotency_key),
+            json=_resend_payload(to_email, query, html_content)
         )
         
         if response.status_code == 200:
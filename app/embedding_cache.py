@@ -0,0 +1,201 @@
+"""
+Two-tier embedding cache in front of the embedding model
+In-memory LRU backed by a persistent SQLite store
+"""
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(self, encoder, model_name: str, db_path: str, memory_size: int = 10000):
+        """
+        Initialize embedding cache
+
+        Args:
+            encoder: Object with an embed(texts) method (e.g. TextEmbedding),
+                     and optionally an awaitable embed_async(texts)
+            model_name: Model name, part of every cache key
+            db_path: SQLite file for the persistent tier
+            memory_size: Maximum vectors kept in the LRU tier
+        """
+        self.encoder = encoder
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'embed_seconds': 0.0
+        }
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode()).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the LRU tier, evicting the oldest entries"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str], int, int]:
+        """
+        Find cached vectors in both tiers
+
+        Returns:
+            Tuple of (keys in input order, vectors found by key, texts
+            to embed by key, memory hits, disk hits)
+        """
+        keys = [self._key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+
+        # Tier 1: in-memory LRU
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+            memory_hits = len(vectors)
+
+            # Tier 2: SQLite
+            missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    vectors[key] = vector
+                    self._remember(key, vector)
+            disk_hits = len(vectors) - memory_hits
+
+        # Only misses go through the model, as one batch
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                to_embed.setdefault(key, text)
+        return keys, vectors, to_embed, memory_hits, disk_hits
+
+    def _store(self, vectors: Dict[str, np.ndarray], to_embed: Dict[str, str], embedded: Iterable):
+        """Add model output to both tiers and to the caller's vectors"""
+        embedded = [np.asarray(vector, dtype=np.float32) for vector in embedded]
+        with self._lock:
+            for key, vector in zip(to_embed, embedded):
+                vectors[key] = vector
+                self._remember(key, vector)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in zip(to_embed, embedded)]
+            )
+            self._db.commit()
+
+    def _record(self, memory_hits: int, disk_hits: int, misses: int, embed_seconds: float,
+                usage: Optional[Dict]):
+        with self._lock:
+            self._stats['memory_hits'] += memory_hits
+            self._stats['disk_hits'] += disk_hits
+            self._stats['misses'] += misses
+            self._stats['embed_seconds'] += embed_seconds
+
+        if usage is not None:
+            usage['hits'] = usage.get('hits', 0) + memory_hits + disk_hits
+            usage['embedded'] = usage.get('embedded', 0) + misses
+            usage['embed_seconds'] = usage.get('embed_seconds', 0.0) + embed_seconds
+
+    def embed(self, texts: Iterable[str], usage: Optional[Dict] = None) -> List[np.ndarray]:
+        """
+        Embed texts, computing only cache misses with the model
+
+        Args:
+            texts: Texts to embed
+            usage: Optional per-job dict accumulating 'hits', 'embedded'
+                   and 'embed_seconds' across calls
+
+        Returns:
+            List of float32 vectors in input order
+        """
+        keys, vectors, to_embed, memory_hits, disk_hits = self._lookup(list(texts))
+
+        # Wall time of the model call: the model may run in its own
+        # threads or in embedding worker processes, where the caller's
+        # CPU time would miss it
+        embed_seconds = 0.0
+        if to_embed:
+            started = time.perf_counter()
+            embedded = list(self.encoder.embed(list(to_embed.values())))
+            embed_seconds = time.perf_counter() - started
+            self._store(vectors, to_embed, embedded)
+
+        self._record(memory_hits, disk_hits, len(to_embed), embed_seconds, usage)
+        return [vectors[key] for key in keys]
+
+    async def embed_async(self, texts: Iterable[str], usage: Optional[Dict] = None,
+                          executor: Optional[Executor] = None) -> List[np.ndarray]:
+        """
+        Embed texts without blocking the event loop (see embed)
+
+        Cache reads and writes run in threads. Misses go to the model's
+        embed_async when it has one (the embedding service), so no thread
+        waits on the batcher; otherwise the model runs in the executor.
+
+        Args:
+            texts: Texts to embed
+            usage: Optional per-job usage dict
+            executor: Executor for an in-process model; None for the default
+        """
+        keys, vectors, to_embed, memory_hits, disk_hits = await asyncio.to_thread(self._lookup, list(texts))
+
+        embed_seconds = 0.0
+        if to_embed:
+            misses = list(to_embed.values())
+            started = time.perf_counter()
+            if hasattr(self.encoder, 'embed_async'):
+                embedded = await self.encoder.embed_async(misses)
+            else:
+                embedded = await asyncio.get_running_loop().run_in_executor(
+                    executor, lambda: list(self.encoder.embed(misses))
+                )
+            embed_seconds = time.perf_counter() - started
+            await asyncio.to_thread(self._store, vectors, to_embed, embedded)
+
+        self._record(memory_hits, disk_hits, len(to_embed), embed_seconds, usage)
+        return [vectors[key] for key in keys]
+
+    def seconds_per_text(self) -> float:
+        """Average model time per embedded text so far"""
+        with self._lock:
+            misses = self._stats['misses']
+            return self._stats['embed_seconds'] / misses if misses else 0.0
+
+    def stats(self) -> Dict:
+        """Snapshot of hit rate and estimated embedding time saved"""
+        per_text = self.seconds_per_text()
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 3) if lookups else 0.0
+        stats['seconds_saved'] = round(hits * per_text, 2)
+        stats['embed_seconds'] = round(stats['embed_seconds'], 2)
+        return stats
@@ -0,0 +1,312 @@
+"""
+Embedding service running the model in dedicated worker processes
+Requests from all jobs are micro-batched up to a maximum batch size;
+vectors come back through shared memory instead of pickled lists. Dead
+workers are restarted and their callers fail instead of waiting forever
+"""
+import time
+import queue
+import asyncio
+import atexit
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.process import BaseProcess
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+def _worker_main(model_name: str, requests_q, results_q):
+    """
+    Worker process loop: embed batches and publish them in shared memory
+
+    Args:
+        model_name: FastEmbed model to load
+        requests_q: This worker's queue of (batch_id, texts), None to stop
+        results_q: Queue of (batch_id, shm_name, shape, error)
+    """
+    from fastembed import TextEmbedding
+
+    model = TextEmbedding(model_name=model_name)
+    while True:
+        item = requests_q.get()
+        if item is None:
+            break
+        batch_id, texts = item
+        try:
+            vectors = np.asarray(list(model.embed(texts)), dtype=np.float32)
+            shm = shared_memory.SharedMemory(create=True, size=max(vectors.nbytes, 1))
+            np.ndarray(vectors.shape, dtype=np.float32, buffer=shm.buf)[:] = vectors
+            results_q.put((batch_id, shm.name, vectors.shape, None))
+            # The parent unlinks the segment once it has read it
+            shm.close()
+        except Exception as e:
+            results_q.put((batch_id, None, None, str(e)))
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str, workers: int = 1,
+                 max_batch_size: int = 64, max_wait_ms: float = 10.0,
+                 timeout: float = 60.0, check_interval: float = 1.0):
+        """
+        Start embedding worker processes
+
+        Args:
+            model_name: FastEmbed model each worker loads
+            workers: Number of worker processes
+            max_batch_size: Maximum texts per model call
+            max_wait_ms: Maximum time a request waits for batch-mates
+            timeout: Seconds embed() waits for its vectors
+            check_interval: Seconds between worker liveness checks
+        """
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._ctx = mp.get_context("spawn")
+        self._results_q = self._ctx.Queue()
+        # Each worker has its own request queue, so batches are tied to it
+        self._workers = [self._start_worker() for _ in range(workers)]
+        self._restarts = 0
+
+        self._pending: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        # Workers without a batch; one batch in flight per worker, so
+        # requests keep batching up while every worker is busy
+        self._idle: "queue.Queue[int]" = queue.Queue()
+        for index in range(workers):
+            self._idle.put(index)
+        # Batch ID -> (worker index, (text count, future) per request)
+        self._in_flight: Dict[int, Tuple[int, List[Tuple[int, Future]]]] = {}
+        self._batch_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._batch_sizes: Dict[int, int] = {}
+        self._closed = False
+
+        self._batch_thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self._result_thread = threading.Thread(target=self._result_loop, daemon=True)
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._batch_thread.start()
+        self._result_thread.start()
+        self._monitor_thread.start()
+        atexit.register(self.close)
+
+    def _start_worker(self) -> Tuple[BaseProcess, Any]:
+        """Start a worker process with its own request queue"""
+        requests_q = self._ctx.Queue()
+        worker = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_name, requests_q, self._results_q),
+            daemon=True
+        )
+        worker.start()
+        return worker, requests_q
+
+    def submit(self, texts: Iterable[str]) -> Future:
+        """
+        Queue texts for embedding without waiting for them
+
+        Requests larger than max_batch_size are split into chunks that
+        are batched on their own.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Future of the list of float32 vectors in input order; fails
+            with RuntimeError if a worker embedding them failed or died
+        """
+        texts = list(texts)
+        result = Future()
+        if not texts:
+            result.set_result([])
+            return result
+
+        chunks = []
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = Future()
+            chunks.append(chunk)
+            self._pending.put((texts[start:start + self.max_batch_size], chunk))
+
+        # Chunks resolve in the result and monitor threads
+        lock = threading.Lock()
+
+        def collect(_):
+            with lock:
+                if result.done():
+                    return
+                for chunk in chunks:
+                    if chunk.done() and chunk.exception() is not None:
+                        result.set_exception(chunk.exception())
+                        return
+                if all(chunk.done() for chunk in chunks):
+                    result.set_result([vector for chunk in chunks for vector in chunk.result()])
+
+        for chunk in chunks:
+            chunk.add_done_callback(collect)
+        return result
+
+    def embed(self, texts: Iterable[str]) -> List[np.ndarray]:
+        """
+        Embed texts through the worker pool, blocking until they are done
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List of float32 vectors in input order
+
+        Raises:
+            TimeoutError: If the vectors do not arrive within the timeout
+            RuntimeError: If the worker embedding them failed or died
+        """
+        texts = list(texts)
+        try:
+            return self.submit(texts).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"Embedding {len(texts)} texts timed out after {self.timeout}s")
+
+    async def embed_async(self, texts: Iterable[str]) -> List[np.ndarray]:
+        """Embed texts without holding a thread while they wait for a batch (see embed)"""
+        texts = list(texts)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(texts)), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Embedding {len(texts)} texts timed out after {self.timeout}s")
+
+    def _batch_loop(self):
+        """Group queued requests into batches and dispatch them"""
+        carry = None
+        while not self._closed:
+            first = carry or self._pending.get()
+            carry = None
+            if first is None:
+                break
+            batch = [first]
+            size = len(first[0])
+
+            # Wait briefly for more requests to share the model call
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._closed = True
+                    break
+                if size + len(item[0]) > self.max_batch_size:
+                    carry = item
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            index = self._idle.get()
+            batch_id = next(self._batch_ids)
+            texts = []
+            with self._lock:
+                self._in_flight[batch_id] = (index, [(len(t), future) for t, future in batch])
+                bucket = 1 << (size - 1).bit_length()
+                self._batch_sizes[bucket] = self._batch_sizes.get(bucket, 0) + 1
+                requests_q = self._workers[index][1]
+            for t, _ in batch:
+                texts.extend(t)
+            requests_q.put((batch_id, texts))
+
+    def _result_loop(self):
+        """Read vectors from shared memory and resolve request futures"""
+        while True:
+            item = self._results_q.get()
+            if item is None:
+                break
+            batch_id, shm_name, shape, error = item
+            with self._lock:
+                index, requests = self._in_flight.pop(batch_id, (None, None))
+            # Batches failed after their worker died already gave back its slot
+            if index is not None:
+                self._idle.put(index)
+
+            if error is not None:
+                self._fail(requests or [], RuntimeError(f"Embedding worker failed: {error}"))
+                continue
+
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                vectors = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+            finally:
+                shm.close()
+                shm.unlink()
+
+            offset = 0
+            for count, future in requests or []:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + count])
+                offset += count
+
+    def _fail(self, requests: List[Tuple[int, Future]], error: Exception):
+        for _, future in requests:
+            if not future.done():
+                future.set_exception(error)
+
+    def _monitor_loop(self):
+        """
+        Restart dead workers
+
+        A dead worker's batch is never answered, so it fails and the
+        worker's slot is handed to its replacement. Batches on other
+        workers are not affected.
+        """
+        while not self._closed:
+            time.sleep(self.check_interval)
+            for index, (worker, _) in enumerate(self._workers):
+                if self._closed or worker.is_alive():
+                    continue
+                print(f"Embedding worker {worker.pid} exited with code {worker.exitcode}, restarting")
+                with self._lock:
+                    failed = [
+                        batch_id for batch_id, (assigned, _) in self._in_flight.items()
+                        if assigned == index
+                    ]
+                    failed = [self._in_flight.pop(batch_id)[1] for batch_id in failed]
+                    # Batches dispatched from here on go to the replacement
+                    self._workers[index] = self._start_worker()
+                    self._restarts += 1
+                for requests in failed:
+                    self._fail(requests, RuntimeError("Embedding worker died"))
+                # An idle worker's slot is still in the idle queue
+                if failed:
+                    self._idle.put(index)
+
+    def stats(self) -> Dict:
+        """Queue depth and batch-size histogram (power-of-two buckets)"""
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'restarts': self._restarts,
+                'queue_depth': self._pending.qsize(),
+                'batches_in_flight': len(self._in_flight),
+                'batch_size_histogram': {
+                    f"<={bucket}": count
+                    for bucket, count in sorted(self._batch_sizes.items())
+                }
+            }
+
+    def close(self):
+        """Stop batching and shut down worker processes"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        for _, requests_q in self._workers:
+            requests_q.put(None)
+        for worker, _ in self._workers:
+            worker.join(timeout=5)
+        self._results_q.put(None)
+        self._result_thread.join(timeout=5)
@@ -0,0 +1,166 @@
+"""
+Streaming chat completions
+Parses the event stream Groq returns for stream=true requests and
+measures time-to-first-token and generation speed per call
+"""
+import json
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+
+class ReportStream:
+    def __init__(self, on_text: Optional[Callable[[str], None]] = None):
+        """
+        Initialize stream state; the clock starts when the request is sent
+
+        Args:
+            on_text: Called with each piece of text as it arrives
+        """
+        self.on_text = on_text
+        self.parts = []
+        self.chunks = 0
+        self.usage_tokens = None
+        self.prompt_tokens = None
+        self.finished = False
+        self.error = None
+        self.status_code = None
+        self._started = time.perf_counter()
+        self._first_token = None
+        self._ended = None
+
+    def restart(self):
+        """Restart the clock for a new attempt, once the call is admitted"""
+        self.error = None
+        self.status_code = None
+        self._started = time.perf_counter()
+
+    @property
+    def text(self) -> str:
+        """Report text received so far"""
+        return "".join(self.parts)
+
+    def feed_line(self, line: str) -> bool:
+        """
+        Consume one line of the event stream
+
+        Args:
+            line: Raw line, e.g. 'data: {...}'
+
+        Returns:
+            True once the stream signalled completion
+        """
+        if not line.startswith("data:"):
+            return self.finished
+        data = line[5:].strip()
+        if data == "[DONE]":
+            self.finish()
+            return True
+
+        chunk = json.loads(data)
+        for choice in chunk.get('choices', []):
+            delta = choice.get('delta', {}).get('content')
+            if delta:
+                if self._first_token is None:
+                    self._first_token = time.perf_counter()
+                self.chunks += 1
+                self.parts.append(delta)
+                if self.on_text:
+                    self.on_text(delta)
+
+        # Groq reports usage on the last chunk under x_groq
+        usage = chunk.get('x_groq', {}).get('usage') or chunk.get('usage')
+        if usage:
+            self.record_usage(usage)
+        return False
+
+    def record_usage(self, usage: Dict):
+        """Take token counts from a completion's usage block"""
+        self.usage_tokens = usage.get('completion_tokens')
+        self.prompt_tokens = usage.get('prompt_tokens')
+
+    def finish(self):
+        if self._ended is None:
+            self._ended = time.perf_counter()
+        self.finished = True
+
+    def metrics(self) -> Dict:
+        """
+        Time to first token, prompt and completion tokens and tokens/sec
+
+        Token counts come from the usage block when the stream got that
+        far, otherwise from the number of content chunks (about one token
+        each).
+        """
+        ended = self._ended or time.perf_counter()
+        first = self._first_token or ended
+        tokens = self.usage_tokens if self.usage_tokens is not None else self.chunks
+        generating = ended - first
+        return {
+            'first_token': round(first - self._started, 3),
+            'tokens': tokens,
+            'prompt_tokens': self.prompt_tokens,
+            'tokens_per_sec': round(tokens / generating, 1) if generating > 0 else None,
+            'complete': self.finished,
+            'failed': self.error is not None,
+            'cached': False
+        }
+
+
+def cached_metrics() -> Dict:
+    """Metrics reported for a report served from the report cache"""
+    return {
+        'first_token': 0.0,
+        'tokens': 0,
+        'prompt_tokens': 0,
+        'tokens_per_sec': None,
+        'complete': True,
+        'failed': False,
+        'cached': True
+    }
+
+
+def partial_report(text: str, reason: str) -> str:
+    """Keep what was generated before the stream broke off"""
+    return f"{text}\n\n[Report incomplete: generation stopped early ({reason})]"
+
+
+class GenerationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.incomplete = 0
+        self.tokens = 0
+        self._prompt_tokens_total = 0
+        self._prompt_calls = 0
+        self._first_token_total = 0.0
+        self._tps_total = 0.0
+        self._tps_calls = 0
+
+    def record(self, metrics: Dict):
+        with self._lock:
+            self.calls += 1
+            self.incomplete += 0 if metrics['complete'] else 1
+            self.tokens += metrics['tokens'] or 0
+            if metrics['prompt_tokens']:
+                self._prompt_tokens_total += metrics['prompt_tokens']
+                self._prompt_calls += 1
+            self._first_token_total += metrics['first_token']
+            if metrics['tokens_per_sec']:
+                self._tps_total += metrics['tokens_per_sec']
+                self._tps_calls += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'incomplete': self.incomplete,
+                'tokens': self.tokens,
+                'avg_prompt_tokens': round(self._prompt_tokens_total / self._prompt_calls) if self._prompt_calls else None,
+                'avg_first_token': round(self._first_token_total / self.calls, 3) if self.calls else None,
+                'avg_tokens_per_sec': round(self._tps_total / self._tps_calls, 1) if self._tps_calls else None
+            }
+
+
+# Shared by every job in the process
+groq_stats = GenerationStats()
@@ -0,0 +1,208 @@
+"""
+Shared outbound HTTP layer for arXiv, Groq and Resend
+One pooled keep-alive httpx client, jittered exponential backoff on
+429/5xx that honors Retry-After, per-host timeout budgets, rate limits
+applied to every attempt, and per-host connection-reuse accounting
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.rate_limiter import TokenBucket
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class HostPolicy:
+    timeout: float
+    budget: float
+    retry_statuses: Tuple[int, ...] = RETRY_STATUSES
+    retries: int = int(os.getenv("HTTP_RETRIES", "3"))
+    backoff_base: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    backoff_max: float = float(os.getenv("HTTP_BACKOFF_MAX", "20"))
+
+
+# Per-attempt timeout and total budget (attempts plus backoff) per host
+HOST_POLICIES = {
+    'export.arxiv.org': HostPolicy(timeout=15, budget=60),
+    # Groq 429s are paced by the Groq scheduler instead
+    'api.groq.com': HostPolicy(timeout=60, budget=90, retry_statuses=(500, 502, 503, 504)),
+    'api.resend.com': HostPolicy(timeout=10, budget=30)
+}
+DEFAULT_POLICY = HostPolicy(timeout=30, budget=60)
+
+
+def host_policy(host: str) -> HostPolicy:
+    return HOST_POLICIES.get(host, DEFAULT_POLICY)
+
+
+def retry_delay(headers, attempt: int, policy: HostPolicy) -> float:
+    """
+    Seconds to wait before the next attempt
+
+    Retry-After (seconds or HTTP date) wins; otherwise full-jitter
+    exponential backoff.
+
+    Args:
+        headers: Response headers, or None after a connection error
+        attempt: Number of attempts made so far
+        policy: Policy of the host
+    """
+    retry_after = headers.get('Retry-After') if headers is not None else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+
+
+class OutboundStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict] = {}
+
+    def _host(self, host: str) -> Dict:
+        return self._hosts.setdefault(host, {
+            'requests': 0,
+            'connections': 0,
+            'retries': 0,
+            'handshake_seconds': 0.0
+        })
+
+    def record_request(self, host: str):
+        with self._lock:
+            self._host(host)['requests'] += 1
+
+    def record_retry(self, host: str):
+        with self._lock:
+            self._host(host)['retries'] += 1
+
+    def record_connection(self, host: str, seconds: float):
+        """A new TCP (and TLS) connection and its handshake time"""
+        with self._lock:
+            stats = self._host(host)
+            stats['connections'] += 1
+            stats['handshake_seconds'] += seconds
+
+    def stats(self) -> Dict:
+        """
+        Per-host connection reuse ratio and handshake time saved, estimated
+        as reused requests times the host's average handshake
+        """
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+        for stats in hosts.values():
+            requests_made, connections = stats['requests'], stats['connections']
+            reused = max(requests_made - connections, 0)
+            average = stats['handshake_seconds'] / connections if connections else 0.0
+            stats['reuse_ratio'] = round(reused / requests_made, 3) if requests_made else 0.0
+            stats['avg_handshake_ms'] = round(average * 1000, 1)
+            stats['handshake_seconds_saved'] = round(reused * average, 2)
+            stats['handshake_seconds'] = round(stats['handshake_seconds'], 2)
+        return hosts
+
+
+# Shared by every job in the process
+outbound_stats = OutboundStats()
+
+
+class AsyncOutboundHTTP:
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20):
+        """
+        Initialize async outbound client
+
+        Args:
+            max_connections: Total connections across hosts
+            max_keepalive: Idle connections kept open for reuse
+        """
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive
+            ),
+            timeout=httpx.Timeout(DEFAULT_POLICY.timeout, connect=10.0)
+        )
+
+    async def request(self, method: str, url: str, stream: bool = False,
+                      limiter: Optional[TokenBucket] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying 429/5xx and transport errors
+
+        Takes the arguments of httpx.AsyncClient.build_request; timeout
+        defaults to the host policy. A limiter is waited on before every
+        attempt, retries included. Streamed responses must be closed by
+        the caller.
+        """
+        host = urlsplit(url).hostname or ""
+        policy = host_policy(host)
+        kwargs.setdefault('timeout', policy.timeout)
+        started = time.monotonic()
+
+        attempt = 0
+        while True:
+            # Connection events are only traced when a new connection is opened
+            handshake = {}
+
+            async def trace(event: str, info: Dict):
+                if event == "connection.connect_tcp.started":
+                    handshake['started'] = time.perf_counter()
+                elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                    handshake['finished'] = time.perf_counter()
+
+            if limiter is not None:
+                await limiter.acquire_async()
+            request = self.client.build_request(method, url, extensions={'trace': trace}, **kwargs)
+            outbound_stats.record_request(host)
+            try:
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError:
+                delay = retry_delay(None, attempt, policy)
+                if attempt >= policy.retries or time.monotonic() - started + delay > policy.budget:
+                    raise
+                response = None
+            finally:
+                if 'finished' in handshake:
+                    outbound_stats.record_connection(host, handshake['finished'] - handshake['started'])
+
+            if response is not None:
+                if response.status_code not in policy.retry_statuses:
+                    return response
+                delay = retry_delay(response.headers, attempt, policy)
+                if attempt >= policy.retries or time.monotonic() - started + delay > policy.budget:
+                    return response
+                await response.aclose()
+
+            attempt += 1
+            outbound_stats.record_retry(host)
+            print(f"Retrying {method} {host} in {delay:.1f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streamed request; retries happen before the body is read"""
+        response = await self.request(method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
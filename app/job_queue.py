@@ -0,0 +1,306 @@
+"""
+Durable research job queue backed by SQLite (WAL mode)
+Jobs survive restarts; workers lease jobs and renew the lease while
+they run, so jobs from a crashed worker are picked up again
+"""
+import os
+import json
+import time
+import uuid
+import zlib
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    def __init__(self, db_path: str, lease_seconds: float = 300,
+                 max_attempts: int = 3, retry_delay: float = 10,
+                 retention_seconds: float = 72 * 3600):
+        """
+        Initialize job queue
+
+        Args:
+            db_path: SQLite database file
+            lease_seconds: How long a leased job stays reserved without a heartbeat
+            max_attempts: Attempts before a job is marked failed
+            retry_delay: Base delay before a failed job is retried (doubles per attempt)
+            retention_seconds: How long finished jobs and their results are kept
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    filters TEXT,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    lease_until REAL,
+                    worker TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    timings TEXT,
+                    result BLOB,
+                    partial TEXT
+                )
+            """)
+            # Databases created before results, filters and partial reports were stored
+            columns = {row['name'] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (('timings', 'TEXT'), ('result', 'BLOB'), ('filters', 'TEXT'),
+                                 ('priority', 'INTEGER NOT NULL DEFAULT 0'), ('partial', 'TEXT')):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            # Partial index in lease order keeps leasing fast as finished
+            # jobs pile up; jobs_pending was created on created_at alone
+            # before priorities existed
+            db.execute("DROP INDEX IF EXISTS jobs_pending")
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_pending_priority ON jobs (priority DESC, created_at) "
+                "WHERE status IN ('queued', 'running')"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at) "
+                "WHERE status IN ('done', 'failed')"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run beside the writer"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def enqueue(self, query: str, email: str, filters: Optional[Dict] = None,
+                priority: int = 0) -> str:
+        """
+        Add a job to the queue
+
+        Args:
+            query: Research query
+            email: Recipient email
+            filters: Optional search filters
+            priority: Higher priorities are leased and served by Groq first
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, query, email, filters, priority, status, available_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, query, email, json.dumps(filters) if filters else None, priority, QUEUED, now, now)
+        )
+        return job_id
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """
+        Reserve the highest-priority, oldest ready job
+
+        Ready means queued and past its retry delay, or running with an
+        expired lease (its worker died).
+
+        Args:
+            worker_id: Identity of the leasing worker
+
+        Returns:
+            Job dict, or None if nothing is ready
+        """
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # The status IN (...) terms let SQLite use the partial index.
+            # Abandoned jobs that are out of attempts fail instead of looping
+            db.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', finished_at = ? "
+                "WHERE status IN ('queued', 'running') AND status = ? "
+                "AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, now, self.max_attempts)
+            )
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') "
+                "AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?)) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, "
+                "worker = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (RUNNING, now + self.lease_seconds, worker_id, now, row['id'])
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+        job = dict(row)
+        job['filters'] = json.loads(job['filters']) if job['filters'] else None
+        job['attempts'] += 1
+        job['status'] = RUNNING
+        job['started_at'] = job['started_at'] or now
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease of a running job; False if it was lost"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + self.lease_seconds, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Optional[Dict] = None,
+                 timings: Optional[Dict] = None):
+        """
+        Mark a job as done and store its result
+
+        The partial report is dropped; the result holds the whole report.
+
+        Args:
+            job_id: Job ID
+            worker_id: Worker that ran the job
+            result: Report, sources and counts; stored as zlib-compressed JSON
+            timings: Seconds spent per stage
+        """
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, error = NULL, "
+            "result = ?, timings = ?, partial = NULL WHERE id = ? AND worker = ?",
+            (
+                DONE,
+                time.time(),
+                zlib.compress(json.dumps(result).encode()) if result is not None else None,
+                json.dumps(timings) if timings is not None else None,
+                job_id,
+                worker_id
+            )
+        )
+
+    def save_partial(self, job_id: str, worker_id: str, text: str):
+        """
+        Store the report text generated so far
+
+        Kept across retries until the job completes, so the text of a
+        cancelled, crashed or failed attempt can still be read.
+
+        Args:
+            job_id: Job ID
+            worker_id: Worker running the job; ignored once it lost the job
+            text: Report text streamed so far
+        """
+        self._connect().execute(
+            "UPDATE jobs SET partial = ? WHERE id = ? AND worker = ?",
+            (text, job_id, worker_id)
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True):
+        """
+        Record a failed attempt
+
+        The job is requeued with exponential backoff until it runs out
+        of attempts, then marked failed.
+
+        Args:
+            job_id: Job ID
+            worker_id: Worker that ran the attempt
+            error: Error description
+            retry: False for errors that will not go away on retry
+        """
+        db = self._connect()
+        row = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return
+        now = time.time()
+        if retry and row['attempts'] < self.max_attempts:
+            delay = self.retry_delay * (2 ** (row['attempts'] - 1))
+            db.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_until = NULL, error = ? "
+                "WHERE id = ? AND worker = ?",
+                (QUEUED, now + delay, error, job_id, worker_id)
+            )
+        else:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, error = ? "
+                "WHERE id = ? AND worker = ?",
+                (FAILED, now, error, job_id, worker_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job with its decoded result
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dict, or None if unknown or purged
+        """
+        row = self._connect().execute(
+            "SELECT id, query, filters, priority, status, attempts, error, created_at, started_at, "
+            "finished_at, timings, result, partial FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['filters'] = json.loads(job['filters']) if job['filters'] else None
+        job['timings'] = json.loads(job['timings']) if job['timings'] else {}
+        job['result'] = json.loads(zlib.decompress(job['result'])) if job['result'] else None
+        return job
+
+    def purge(self) -> int:
+        """
+        Delete finished jobs older than the retention period
+
+        Returns:
+            Number of jobs deleted
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - self.retention_seconds,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Number of jobs per status"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"
+        ).fetchall()
+        stats = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        stats.update({row['status']: row['count'] for row in rows})
+        return stats
+
+
+# Shared by the API and in-process workers; standalone workers open
+# the same database file
+job_queue = JobQueue(
+    db_path=os.getenv("JOB_DB_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "jobs.sqlite")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_delay=float(os.getenv("JOB_RETRY_DELAY", "10")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "72")) * 3600
+)
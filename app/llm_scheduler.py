@@ -0,0 +1,216 @@
+"""
+Rate-limit-aware scheduler for Groq completions
+Tracks the request and token budgets Groq reports in its x-ratelimit-*
+response headers, and admits waiting calls in priority order only when
+their estimated token cost fits the remaining budget
+"""
+import os
+import re
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from typing import Callable, Dict, Optional
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a reset duration such as '7.66s', '2m59.56s' or '120ms'
+
+    Returns:
+        Seconds, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_tokens(prompt: str, max_tokens: int,
+                    count_tokens: Optional[Callable[[str], int]] = None) -> int:
+    """
+    Token cost of a completion as counted against the budget
+
+    The prompt's tokens (about four characters each unless a counter is
+    given), plus the full completion allowance.
+    """
+    prompt_tokens = count_tokens(prompt) if count_tokens else len(prompt) // 4
+    return prompt_tokens + max_tokens
+
+
+class _Budget:
+    """Remaining amount of one limit and when it resets"""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+
+    def update(self, limit, remaining, reset, now: float):
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset is not None:
+            self.reset_at = now + reset
+
+    def refresh(self, now: float):
+        if self.limit is not None and self.reset_at and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = 0.0
+
+
+class GroqScheduler:
+    def __init__(self, poll_interval: float = 0.25, probe_timeout: float = 30):
+        """
+        Initialize scheduler; budgets are unknown until the first response
+
+        Args:
+            poll_interval: Longest sleep between admission checks while
+                           waiting behind another call
+            probe_timeout: While budgets are unknown, one call runs at a
+                           time; another is admitted after this many
+                           seconds without a response
+        """
+        self.poll_interval = poll_interval
+        self.probe_timeout = probe_timeout
+        self._probe_until = 0.0
+        self._requests = _Budget()
+        self._tokens = _Budget()
+        self._blocked_until = 0.0
+        self._waiting = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {
+            'admitted': 0,
+            'rate_limited': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _try_admit(self, ticket, cost: int) -> float:
+        """Admit the ticket and return 0, or return seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refresh(now)
+            self._tokens.refresh(now)
+
+            # Strict priority: only the head of the queue may start
+            if self._waiting[0] != ticket:
+                return self.poll_interval
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._requests.remaining is None and self._tokens.remaining is None:
+                # Learn the budgets from one response before sending more
+                if now < self._probe_until:
+                    return self.poll_interval
+                self._probe_until = now + self.probe_timeout
+            if self._requests.remaining is not None and self._requests.remaining < 1:
+                return max(self._requests.reset_at - now, self.poll_interval)
+            if self._tokens.remaining is not None and self._tokens.remaining < cost:
+                # A call larger than the whole window runs once it is full
+                full = self._tokens.limit is not None and self._tokens.remaining >= self._tokens.limit
+                if not full:
+                    return max(self._tokens.reset_at - now, self.poll_interval)
+
+            heapq.heappop(self._waiting)
+            if self._requests.remaining is not None:
+                self._requests.remaining -= 1
+            if self._tokens.remaining is not None:
+                self._tokens.remaining -= cost
+            self._stats['admitted'] += 1
+            return 0.0
+
+    def _enqueue(self, priority: int):
+        ticket = (-priority, next(self._order))
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _cancel(self, ticket):
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+
+    def _waited(self, started: float):
+        with self._lock:
+            self._stats['wait_seconds'] += time.monotonic() - started
+
+    async def acquire_async(self, cost: int, priority: int = 0):
+        """
+        Wait until a call of this estimated token cost may start
+
+        Args:
+            cost: Estimated tokens (see estimate_tokens)
+            priority: Higher priorities are admitted first
+        """
+        ticket = self._enqueue(priority)
+        started = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(ticket, cost)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(min(wait, self.poll_interval))
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        finally:
+            self._waited(started)
+
+    def update(self, status_code: int, headers):
+        """
+        Take the budgets reported by a Groq response
+
+        Args:
+            status_code: HTTP status; a 429 pauses admissions until
+                         Retry-After (or the token reset) has passed
+            headers: Response headers
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._probe_until = 0.0
+            self._requests.update(
+                headers.get('x-ratelimit-limit-requests'),
+                headers.get('x-ratelimit-remaining-requests'),
+                parse_duration(headers.get('x-ratelimit-reset-requests')),
+                now
+            )
+            self._tokens.update(
+                headers.get('x-ratelimit-limit-tokens'),
+                headers.get('x-ratelimit-remaining-tokens'),
+                parse_duration(headers.get('x-ratelimit-reset-tokens')),
+                now
+            )
+            if status_code == 429:
+                self._stats['rate_limited'] += 1
+                pause = (
+                    parse_duration(headers.get('retry-after'))
+                    or parse_duration(headers.get('x-ratelimit-reset-tokens'))
+                    or 1.0
+                )
+                self._blocked_until = max(self._blocked_until, now + pause)
+
+    def stats(self) -> Dict:
+        """Budgets as last reported, queue depth and time spent waiting"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['waiting'] = len(self._waiting)
+            stats['remaining_requests'] = self._requests.remaining
+            stats['remaining_tokens'] = self._tokens.remaining
+        stats['wait_seconds'] = round(stats['wait_seconds'], 2)
+        return stats
+
+
+# Shared by every job in the process
+groq_scheduler = GroqScheduler(poll_interval=float(os.getenv("GROQ_SCHEDULER_POLL", "0.25")))
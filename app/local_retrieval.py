@@ -0,0 +1,124 @@
+"""
+In-process ranking of a job's freshly fetched papers
+Scores the candidates with one matrix-vector product using the same
+similarity-plus-recency formula as the Qdrant search, so Qdrant writes
+can leave the critical path and become background corpus building
+"""
+import time
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.arxiv_parser import published_timestamp
+
+
+def _matches(doc: Dict, filters: Optional[Dict]) -> bool:
+    """Python equivalent of ResearchEngine._search_filter"""
+    if not filters:
+        return True
+    published = published_timestamp(doc)
+    if filters.get('date_from'):
+        start = published_timestamp({'published_date': filters['date_from']})
+        if published is None or published < start:
+            return False
+    if filters.get('date_to'):
+        end = published_timestamp({'published_date': filters['date_to']}) + 86400
+        if published is None or published >= end:
+            return False
+    if filters.get('categories') and not set(filters['categories']) & set(doc.get('categories', [])):
+        return False
+    if filters.get('sources') and doc.get('source') not in filters['sources']:
+        return False
+    return True
+
+
+def rank_candidates(query_vector, documents: List[Dict], vectors: List, top_k: int,
+                    min_relevance: float, recency_weight: float, half_life_days: float,
+                    filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Rank candidate papers against a query
+
+    Args:
+        query_vector: Query embedding
+        documents: Candidate papers
+        vectors: Embeddings of the papers, in the same order
+        top_k: Number of results to return
+        min_relevance: Minimum cosine similarity
+        recency_weight: Weight of the recency bonus
+        half_life_days: Age at which the recency bonus halves
+        filters: Optional search filters
+
+    Returns:
+        Top papers in the shape of ResearchEngine._format_hits, best first
+    """
+    if not documents:
+        return []
+
+    # Cosine similarity; cached vectors are read-only, so normalize copies
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = np.asarray(query_vector, dtype=np.float32)
+    similarity = matrix @ (query / np.linalg.norm(query))
+
+    # Papers without a date get no recency bonus, like the Qdrant default
+    published = np.array([published_timestamp(doc) or 0.0 for doc in documents])
+    age_days = np.abs(time.time() - published) / 86400
+    scores = similarity + recency_weight * 0.5 ** (age_days / half_life_days)
+
+    eligible = (similarity >= min_relevance) & np.array([_matches(doc, filters) for doc in documents])
+    scores[~eligible] = -np.inf
+
+    ranked = []
+    for index in np.argsort(-scores, kind="stable")[:top_k]:
+        if not eligible[index]:
+            break
+        doc = documents[index]
+        ranked.append({
+            'title': doc['title'],
+            'content': doc['content'],
+            'url': doc['url'],
+            'source': doc.get('source', 'unknown'),
+            'published_date': doc.get('published_date', 'unknown'),
+            'arxiv_id': doc.get('arxiv_id'),
+            'relevance_score': float(scores[index])
+        })
+    return ranked
+
+
+class RetrievalStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._searches = {}
+        self.background_stores = 0
+        self.background_store_seconds = 0.0
+
+    def record_search(self, mode: str, seconds: float):
+        with self._lock:
+            count, total = self._searches.get(mode, (0, 0.0))
+            self._searches[mode] = (count + 1, total + seconds)
+
+    def record_background_store(self, seconds: float):
+        with self._lock:
+            self.background_stores += 1
+            self.background_store_seconds += seconds
+
+    def stats(self) -> Dict:
+        """
+        Average search latency per retrieval mode, and Qdrant write time
+        taken off the critical path by local retrieval
+        """
+        with self._lock:
+            return {
+                'avg_search_ms': {
+                    mode: round(total / count * 1000, 2)
+                    for mode, (count, total) in self._searches.items()
+                },
+                'searches': {mode: count for mode, (count, _) in self._searches.items()},
+                'background_stores': self.background_stores,
+                'store_seconds_off_critical_path': round(self.background_store_seconds, 2)
+            }
+
+
+# Shared by every job in the process
+retrieval_stats = RetrievalStats()
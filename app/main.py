@@ -1,20 +1,37 @@
 """
 FastAPI Backend for DeskResearcher
 """
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date
 import os
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
-from app.research_engine import ResearchEngine
-from app.email_service import send_research_report
-
-# Load environment variables
+# Load environment variables before app modules read their settings
 load_dotenv()
 
+from app.research_engine import ResearchEngine
+from app.async_pipeline import AsyncResearchPipeline
+from app.arxiv_cache import arxiv_cache
+from app.single_flight import async_research_flight
+from app.job_queue import job_queue, DONE, FAILED
+from app.worker import WorkerPool
+from app.progress import progress_broker
+from app.groq_stream import groq_stats
+from app.report_cache import report_cache
+from app.map_reduce import map_note_cache
+from app.paper_digests import digest_store
+from app.semantic_cache import semantic_cache
+from app.local_retrieval import retrieval_stats
+from app.http_client import outbound_stats
+from app.llm_scheduler import groq_scheduler
+
 # Initialize FastAPI
 app = FastAPI(
     title="DeskResearcher API",
@@ -37,22 +54,49 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 # Initialize research engine (singleton)
 try:
     research_engine = ResearchEngine()
+    research_pipeline = AsyncResearchPipeline(research_engine)
     print("Research Engine initialized correctly")
 except Exception as e:
     print(f"Error initializing Research Engine: {e}")
     research_engine = None
+    research_pipeline = None
+
+# Job workers in the API process; set INLINE_WORKERS=false to run
+# them only as standalone processes (python -m app.worker)
+worker_pool = None
+if research_pipeline and os.getenv("INLINE_WORKERS", "true").lower() == "true":
+    worker_pool = WorkerPool(
+        research_pipeline,
+        job_queue,
+        concurrency=int(os.getenv("JOB_WORKERS", "4")),
+        partial_interval=float(os.getenv("JOB_PARTIAL_INTERVAL", "5"))
+    )
 
 
 # Pydantic models
+class SearchFilters(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    categories: List[str] = []
+    sources: List[str] = []
+
+
 class ResearchRequest(BaseModel):
     query: str
     email: EmailStr
+    filters: Optional[SearchFilters] = None
+    # Higher priorities are run and served by Groq first
+    priority: int = Field(default=0, ge=0, le=9)
     
     class Config:
         json_schema_extra = {
             "example": {
                 "query": "Recent advances in quantum computing for cryptography",
-                "email": "researcher@example.com"
+                "email": "researcher@example.com",
+                "filters": {
+                    "date_from": "2024-01-01",
+                    "categories": ["quant-ph", "cs.CR"]
+                }
             }
         }
 
@@ -60,35 +104,28 @@ class ResearchRequest(BaseModel):
 class ResearchResponse(BaseModel):
     status: str
     message: str
+    job_id: Optional[str] = None
 
 
-# Background task for asynchronous processing
-def process_research_task(query: str, email: str):
-    """
-    Background task that executes the complete research
-    """
-    try:
-        # Execute research
-        result = research_engine.run_full_research(query)
-        
-        if result['status'] == 'success':
-            # Send email with results
-            email_sent = send_research_report(
-                to_email=email,
-                query=query,
-                report=result['report'],
-                sources=result['sources']
-            )
-            
-            if email_sent:
-                print(f"Complete process successful for {email}")
-            else:
-                print(f"Research completed but email failed for {email}")
-        else:
-            print(f"Research failed: {result.get('message')}")
-            
-    except Exception as e:
-        print(f"Error in background task: {e}")
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    query: str
+    filters: Optional[Dict[str, Any]] = None
+    priority: int = 0
+    attempts: int
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    timings: Dict[str, float] = {}
+    sources: List[Dict[str, Any]] = []
+    report: Optional[str] = None
+    # Report text generated so far while the job runs or waits to retry
+    partial_report: Optional[str] = None
+    generation: Optional[Dict[str, Any]] = None
+    # Embedding cache hits, hit rate and seconds saved by the run
+    embedding: Optional[Dict[str, Any]] = None
 
 
 # Endpoints
@@ -111,7 +148,7 @@ async def health_check():
 
 
 @app.post("/api/research", response_model=ResearchResponse)
-async def create_research(request: ResearchRequest, background_tasks: BackgroundTasks):
+async def create_research(request: ResearchRequest):
     """
     Start a new research
     
@@ -144,12 +181,116 @@ async def create_research(request: ResearchRequest, background_tasks: Background
             detail="Query must be at least 10 characters"
         )
     
-    # Add background task
-    background_tasks.add_task(process_research_task, request.query, request.email)
+    # Empty filters are dropped so they do not split caches and coalescing
+    filters = None
+    if request.filters:
+        if (request.filters.date_from and request.filters.date_to
+                and request.filters.date_from > request.filters.date_to):
+            raise HTTPException(
+                status_code=400,
+                detail="date_from must not be after date_to"
+            )
+        filters = {
+            key: value
+            for key, value in request.filters.model_dump(mode="json").items()
+            if value
+        } or None
+    
+    # Persist the job; a worker picks it up from the queue
+    job_id = await asyncio.to_thread(
+        job_queue.enqueue, request.query, request.email, filters, request.priority
+    )
     
     return ResearchResponse(
         status="processing",
-        message=f"Your research is being processed. You will receive an email at {request.email} in 1-3 minutes."
+        message=f"Your research is being processed. You will receive an email at {request.email} in 1-3 minutes.",
+        job_id=job_id
+    )
+
+
+@app.get("/api/research/{job_id}", response_model=JobStatusResponse)
+async def get_research(job_id: str):
+    """
+    Job status, per-stage timings, and the report once it is ready
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Research job not found"}
+        )
+    
+    result = job['result'] or {}
+    return JobStatusResponse(
+        job_id=job['id'],
+        status=job['status'],
+        query=job['query'],
+        filters=job['filters'],
+        priority=job['priority'],
+        attempts=job['attempts'],
+        error=job['error'],
+        created_at=job['created_at'],
+        started_at=job['started_at'],
+        finished_at=job['finished_at'],
+        timings=job['timings'],
+        sources=result.get('sources', []),
+        report=result.get('report'),
+        partial_report=job['partial'],
+        generation=result.get('generation'),
+        embedding=result.get('embedding')
+    )
+
+
+def _sse(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _final_event(job: Dict) -> str:
+    """Final event for a job read from the queue"""
+    if job['status'] == DONE:
+        return _sse(DONE, dict(job['result'] or {}, timings=job['timings']))
+    return _sse(FAILED, {'error': job['error']})
+
+
+@app.get("/api/research/{job_id}/events")
+async def research_events(job_id: str):
+    """
+    Stream job progress as server-sent events
+
+    Stage events (papers, embedded, search, report_delta, report) are
+    followed by a final done or failed event. Jobs run by a standalone
+    worker only get the final event, picked up from the queue.
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Research job not found"}
+        )
+
+    async def stream():
+        if job['status'] in (DONE, FAILED):
+            yield _final_event(job)
+            return
+        async for item in progress_broker.subscribe(job_id, timeout=5):
+            if item is None:
+                # Idle: the job may be running in another process
+                current = await asyncio.to_thread(job_queue.get, job_id)
+                if current is None:
+                    return
+                if current['status'] in (DONE, FAILED):
+                    yield _final_event(current)
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            event, data = item
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -162,12 +303,54 @@ async def get_status():
         "components": {
             "research_engine": "active" if research_engine else "inactive",
             "qdrant": "connected" if research_engine else "disconnected",
+            "qdrant_mode": research_engine.qdrant_mode if research_engine else None,
             "groq_api": "configured" if os.getenv("GROQ_API_KEY") else "missing",
             "resend_api": "configured" if os.getenv("RESEND_API_KEY") else "missing"
-        }
+        },
+        "arxiv_cache": arxiv_cache.stats(),
+        "jobs": job_queue.stats(),
+        "coalescing": async_research_flight.stats(),
+        "generation": groq_stats.stats(),
+        "groq_scheduler": groq_scheduler.stats(),
+        "report_cache": report_cache.stats(),
+        "map_note_cache": dict(
+            map_note_cache.stats(),
+            report_mode=research_engine.report_mode if research_engine else None
+        ),
+        "http": outbound_stats.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "digests": dict(
+            digest_store.stats(),
+            report_context=research_engine.report_context if research_engine else None
+        ),
+        "retrieval": dict(
+            retrieval_stats.stats(),
+            mode=research_engine.retrieval_mode if research_engine else None
+        ),
+        "embedding_cache": research_engine.encoder.stats() if research_engine else None,
+        "embedding_service": (
+            research_engine.embedding_service.stats()
+            if research_engine and research_engine.embedding_service else None
+        )
     }
 
 
+@app.on_event("startup")
+async def startup():
+    """Start in-process job workers"""
+    if worker_pool:
+        worker_pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop job workers and close pooled connections"""
+    if worker_pool:
+        await worker_pool.stop()
+    if research_pipeline:
+        await research_pipeline.close()
+
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
@@ -0,0 +1,125 @@
+"""
+Map-reduce report generation for large source sets
+Papers are summarized in groups (map), each group's notes are remapped
+from the group's local [n] numbering to the papers' positions in the
+source list, and the notes are merged into one cited report (reduce).
+Per-paper notes are cached so later jobs on the same question reuse them,
+even when the paper sits at a different position in their source list
+"""
+import os
+import re
+from typing import Dict, List, Tuple
+
+from app.report_cache import ReportCache
+
+# Bump when the map prompt changes so cached notes are not reused
+MAP_PROMPT_VERSION = 1
+REDUCE_PROMPT_VERSION = 1
+# Completion allowance of one map call, per paper in the group
+MAP_TOKENS_PER_PAPER = 120
+
+_NOTE_LINE = re.compile(r"^\s*\[(\d+)\]\s*(.+?)\s*$", re.MULTILINE)
+_CITATION = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+_NOT_RELEVANT = re.compile(r"^not relevant\b", re.IGNORECASE)
+
+
+def group_papers(numbered: List[Tuple[int, Dict]], group_size: int) -> List[List[Tuple[int, Dict]]]:
+    """
+    Split (source number, paper) pairs into groups
+
+    Source numbers are 1-based positions in the source list, the numbers
+    the final report cites.
+    """
+    return [numbered[i:i + group_size] for i in range(0, len(numbered), group_size)]
+
+
+def build_map_prompt(query: str, group: List[Tuple[int, Dict]]) -> str:
+    """
+    Prompt asking for one note per paper of a group
+
+    Papers are numbered [1]..[k] within the group.
+    """
+    papers = "\n".join(
+        f"[{local}] Title: {doc['title']}\n"
+        f"Published: {doc['published_date']}\n"
+        f"Abstract: {doc['content']}\n"
+        for local, (_, doc) in enumerate(group, 1)
+    )
+    return f"""You are an expert research assistant preparing notes for a literature review.
+
+RESEARCH QUESTION:
+{query}
+
+PAPERS:
+{papers}
+INSTRUCTIONS:
+1. Write one line per paper, starting with its number in brackets, e.g. "[2] ..."
+2. In at most two sentences, state the paper's findings that bear on the research question
+3. Write "[n] Not relevant." for a paper that does not address the question
+4. Describe each paper on its own; do not refer to other papers by number
+5. DO NOT invent information not present in the abstracts
+
+NOTES:"""
+
+
+def parse_map_notes(text: str, group: List[Tuple[int, Dict]]) -> Dict[int, str]:
+    """
+    Extract per-paper notes from a map completion
+
+    Args:
+        text: Completion text
+        group: The (source number, paper) pairs the prompt listed
+
+    Returns:
+        Notes keyed by source number
+    """
+    mapping = {local: number for local, (number, _) in enumerate(group, 1)}
+    notes = {}
+    for local, note in _NOTE_LINE.findall(text):
+        number = mapping.get(int(local))
+        if number is not None and number not in notes:
+            # Cross-references would go stale once the note is cached
+            # and reused under another numbering
+            notes[number] = re.sub(r"\s+", " ", _CITATION.sub("", note)).strip()
+    return notes
+
+
+def build_reduce_prompt(query: str, notes: List[Tuple[int, Dict, str]]) -> str:
+    """
+    Prompt merging per-paper notes into the final report
+
+    Args:
+        query: Research question
+        notes: (source number, paper, note) in source order
+    """
+    findings = "\n".join(
+        f"[{number}] {doc['title']} ({doc['published_date']}): {note}"
+        for number, doc, note in notes
+        if not _NOT_RELEVANT.match(note)
+    )
+    return f"""You are an expert research assistant specializing in academic literature review.
+
+RESEARCH QUESTION:
+{query}
+
+FINDINGS FROM RECENT ACADEMIC PAPERS (numbered as in the source list):
+{findings}
+
+INSTRUCTIONS:
+1. Generate a professional executive summary of maximum 450 words
+2. Emphasize the MOST RECENT findings and developments
+3. Identify key trends and patterns across the papers
+4. Cite sources with the numbers given above, e.g. [3] or [3, 17]
+5. Mention publication dates when discussing findings to highlight recency
+6. Write in clear, professional English
+7. DO NOT invent information not present in the findings
+
+REPORT:"""
+
+
+# Per-paper map notes, shared by every job in the process
+map_note_cache = ReportCache(
+    db_path=os.getenv("MAP_NOTE_CACHE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "map_notes.sqlite")),
+    ttl=float(os.getenv("MAP_NOTE_CACHE_TTL", str(7 * 86400))),
+    max_bytes=int(os.getenv("MAP_NOTE_CACHE_MAX_MB", "20")) * 1024 * 1024
+)
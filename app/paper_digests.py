@@ -0,0 +1,216 @@
+"""
+Persistent per-paper digests
+A compact digest and the key claims of each paper, keyed by versioned
+arXiv ID, so report prompts can cite popular papers from a few sentences
+instead of resending their full abstracts in every report
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from app.context_packer import split_sentences, content_terms
+
+# Bump when digest generation changes so stored digests are rebuilt
+DIGEST_VERSION = 1
+# Completion allowance of one LLM digest, per paper in the batch
+DIGEST_TOKENS_PER_PAPER = 150
+
+_CLAIM_CUES = re.compile(
+    r"\b(we (show|find|demonstrate|prove|propose|introduce|present)|outperform\w*|"
+    r"achiev\w*|improv\w*|reduc\w*|state[- ]of[- ]the[- ]art|\d+(\.\d+)?\s*(%|x|times))",
+    re.IGNORECASE
+)
+_DIGEST_LINE = re.compile(r"^\s*\[(\d+)\]\s*DIGEST:\s*(.+?)\s*\|\s*CLAIMS:\s*(.*?)\s*$", re.MULTILINE)
+
+
+def paper_key(doc: Dict) -> str:
+    """Versioned arXiv ID, or the URL for papers without one"""
+    return doc.get('arxiv_id') or doc['url']
+
+
+def extractive_digest(doc: Dict, count_tokens: Callable[[str], int],
+                      max_tokens: int = 80) -> Tuple[str, List[str]]:
+    """
+    Digest built from the abstract's own sentences
+
+    The opening sentence is always kept, then up to three sentences
+    stating results become the claims, then the sentences carrying most
+    of the abstract's (and title's) recurring terms fill the digest.
+
+    Args:
+        doc: Paper dict
+        count_tokens: Token counter
+        max_tokens: Length limit of digest and claims together
+
+    Returns:
+        Tuple of (digest, key claims)
+    """
+    sentences = split_sentences(doc['content']) or [doc['content']]
+    frequency = Counter(content_terms(doc['title']))
+    for sentence in sentences:
+        frequency.update(content_terms(sentence))
+
+    def centrality(sentence: str) -> float:
+        terms = content_terms(sentence)
+        return sum(frequency[term] for term in terms) / (len(terms) + 1)
+
+    budget = max_tokens - count_tokens(sentences[0])
+    claims = []
+    for sentence in sentences[1:]:
+        tokens = count_tokens(sentence)
+        if len(claims) < 3 and _CLAIM_CUES.search(sentence) and tokens <= budget:
+            claims.append(sentence)
+            budget -= tokens
+
+    chosen = {0}
+    for position in sorted(range(1, len(sentences)), key=lambda i: -centrality(sentences[i])):
+        tokens = count_tokens(sentences[position])
+        if sentences[position] not in claims and tokens <= budget:
+            chosen.add(position)
+            budget -= tokens
+    return " ".join(sentences[i] for i in sorted(chosen)), claims
+
+
+def build_digest_prompt(documents: List[Dict]) -> str:
+    """Prompt asking for a digest and key claims of each paper"""
+    papers = "\n".join(
+        f"[{i}] Title: {doc['title']}\n"
+        f"Abstract: {doc['content']}\n"
+        for i, doc in enumerate(documents, 1)
+    )
+    return f"""You are an expert research assistant condensing papers for later literature reviews.
+
+PAPERS:
+{papers}
+INSTRUCTIONS:
+1. Write one line per paper in the form "[n] DIGEST: ... | CLAIMS: claim; claim"
+2. The digest states the problem, method and main result in at most two sentences
+3. List up to three key claims, each with its numbers where the abstract gives them
+4. DO NOT invent information not present in the abstracts
+
+DIGESTS:"""
+
+
+def parse_digests(text: str, documents: List[Dict]) -> Dict[str, Tuple[str, List[str]]]:
+    """
+    Extract digests from an LLM completion
+
+    Returns:
+        (digest, claims) keyed by paper_key
+    """
+    digests = {}
+    for number, digest, claims in _DIGEST_LINE.findall(text):
+        index = int(number) - 1
+        if 0 <= index < len(documents):
+            digests[paper_key(documents[index])] = (
+                digest, [claim.strip() for claim in claims.split(";") if claim.strip()]
+            )
+    return digests
+
+
+def digest_content(digest: str, claims: List[str]) -> str:
+    """Text that stands in for the abstract in a report prompt"""
+    if not claims:
+        return digest
+    return f"{digest} Key claims: " + "; ".join(claims)
+
+
+class DigestStore:
+    def __init__(self, db_path: str):
+        """
+        Initialize digest store
+
+        Args:
+            db_path: SQLite file holding the digests; a new arXiv version
+                     is a new key, so entries never go stale
+        """
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'abstract_tokens': 0,
+            'digest_tokens': 0
+        }
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                paper_id TEXT NOT NULL,
+                method TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                claims TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (paper_id, method)
+            )
+        """)
+        self._db.commit()
+
+    def get_many(self, paper_ids: List[str], method: str) -> Dict[str, Tuple[str, List[str]]]:
+        """
+        Look up digests
+
+        Args:
+            paper_ids: Keys from paper_key
+            method: 'extractive' or 'llm'
+
+        Returns:
+            (digest, claims) keyed by paper ID, for the papers found
+        """
+        found = {}
+        with self._lock:
+            for paper_id in paper_ids:
+                row = self._db.execute(
+                    "SELECT digest, claims FROM digests WHERE paper_id = ? AND method = ? AND version = ?",
+                    (paper_id, method, DIGEST_VERSION)
+                ).fetchone()
+                if row is not None:
+                    found[paper_id] = (row[0], json.loads(row[1]))
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(paper_ids) - len(found)
+        return found
+
+    def put_many(self, digests: Dict[str, Tuple[str, List[str]]], method: str):
+        """Store digests keyed by paper ID"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO digests "
+                "(paper_id, method, version, digest, claims, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (paper_id, method, DIGEST_VERSION, digest, json.dumps(claims), now)
+                    for paper_id, (digest, claims) in digests.items()
+                ]
+            )
+            self._db.commit()
+
+    def record_savings(self, abstract_tokens: int, digest_tokens: int):
+        """Tokens of the abstracts a report prompt replaced with digests"""
+        with self._lock:
+            self._stats['abstract_tokens'] += abstract_tokens
+            self._stats['digest_tokens'] += digest_tokens
+
+    def stats(self) -> Dict:
+        """Snapshot of store counters and the prompt compression achieved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._db.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['compression'] = (
+            round(stats['abstract_tokens'] / stats['digest_tokens'], 2) if stats['digest_tokens'] else None
+        )
+        return stats
+
+
+# Shared by every job in the process
+digest_store = DigestStore(
+    db_path=os.getenv("DIGEST_STORE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "digests.sqlite"))
+)
@@ -0,0 +1,115 @@
+"""
+Progress events for research jobs
+The pipeline publishes stage events per research run; every job attached
+to that run (including coalesced duplicates) receives them
+"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+# Events after which a job's stream ends
+FINAL_EVENTS = ("done", "failed")
+
+
+class ProgressBroker:
+    def __init__(self, history_ttl: float = 300, idle_ttl: float = 3600):
+        """
+        Initialize broker
+
+        Args:
+            history_ttl: Seconds a finished job's events stay available
+                         for late subscribers
+            idle_ttl: Seconds the events of an unfinished job stay after
+                      its latest one, e.g. once its retry runs in another
+                      process or the job is purged
+        """
+        self.history_ttl = history_ttl
+        self.idle_ttl = idle_ttl
+        self._history: Dict[str, List[Tuple[str, Dict]]] = {}
+        self._expiry: Dict[str, asyncio.TimerHandle] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._runs: Dict[str, Set[str]] = {}
+
+    def attach(self, job_id: str, run_key: str):
+        """Route events of a pipeline run to a job"""
+        self._runs.setdefault(run_key, set()).add(job_id)
+        self._history.setdefault(job_id, [])
+
+    def detach(self, job_id: str, run_key: str):
+        jobs = self._runs.get(run_key)
+        if jobs is not None:
+            jobs.discard(job_id)
+            if not jobs:
+                del self._runs[run_key]
+
+    def publish(self, run_key: str, event: str, data: Dict):
+        """Send a stage event to every job attached to the run"""
+        for job_id in list(self._runs.get(run_key, ())):
+            self.emit(job_id, event, data)
+
+    def emit(self, job_id: str, event: str, data: Dict):
+        """
+        Send an event to one job
+
+        Each event pushes back the cleanup of the job's history: after
+        history_ttl for final events, idle_ttl for the others.
+        """
+        self._history.setdefault(job_id, []).append((event, data))
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait((event, data))
+        expiry = self._expiry.pop(job_id, None)
+        if expiry is not None:
+            expiry.cancel()
+        self._expiry[job_id] = asyncio.get_running_loop().call_later(
+            self.history_ttl if event in FINAL_EVENTS else self.idle_ttl, self._expire, job_id
+        )
+
+    def _expire(self, job_id: str):
+        self._history.pop(job_id, None)
+        self._expiry.pop(job_id, None)
+
+    def report_text(self, job_id: str) -> str:
+        """Report text streamed to a job since its latest attempt started"""
+        parts: List[str] = []
+        for event, data in self._history.get(job_id, ()):
+            if event == 'started':
+                parts = []
+            elif event == 'report_delta':
+                parts.append(data['text'])
+        return "".join(parts)
+
+    async def subscribe(self, job_id: str, timeout: Optional[float] = None) -> AsyncIterator[Optional[Tuple[str, Dict]]]:
+        """
+        Replay past events for a job, then follow live ones
+
+        Args:
+            job_id: Job to follow
+            timeout: If set, yield None after this many idle seconds so
+                     the caller can check on the job or send a keep-alive
+
+        Yields:
+            (event, data) tuples, or None on idle timeout
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in self._history.get(job_id, ()):
+            queue.put_nowait(item)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield item
+                if item[0] in FINAL_EVENTS:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+
+# Shared by the pipeline, in-process workers and the API
+progress_broker = ProgressBroker()
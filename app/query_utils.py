@@ -0,0 +1,58 @@
+"""
+Query normalization helpers
+Used to recognize equivalent research queries across caches
+"""
+import json
+from typing import Dict, Optional
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a research query for cache keys and coalescing
+
+    Lowercases, collapses whitespace and strips surrounding punctuation,
+    so "Quantum  crypto?" and "quantum crypto" map to the same key.
+
+    Args:
+        query: Raw user query
+
+    Returns:
+        Normalized query string
+    """
+    return " ".join(query.lower().split()).strip(" .?!")
+
+
+def research_key(query: str, filters: Optional[Dict] = None) -> str:
+    """
+    Key identifying a research run, for coalescing and progress routing
+
+    Runs of the same query with different search filters retrieve
+    different sources, so the filters are part of the key.
+
+    Args:
+        query: Raw user query
+        filters: Optional search filters
+
+    Returns:
+        Normalized query, followed by the filters when there are any
+    """
+    normalized = normalize_query(query)
+    if not filters:
+        return normalized
+    return f"{normalized} {json.dumps(filters, sort_keys=True)}"
+
+
+def fetch_key(query: str) -> str:
+    """
+    Key for progress events of the arXiv fetch stage
+
+    Fetching ignores search filters, so one fetch serves runs of the
+    same query with any filters.
+
+    Args:
+        query: Raw user query
+
+    Returns:
+        Key distinct from every research_key
+    """
+    return f"fetch:{normalize_query(query)}"
@@ -0,0 +1,80 @@
+"""
+Token bucket rate limiter shared across research jobs
+Keeps outbound API calls within upstream politeness limits
+"""
+import os
+import asyncio
+import threading
+import time
+from typing import Tuple
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize token bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._reservations = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> Tuple[float, int]:
+        """
+        Take tokens (possibly going negative)
+
+        Returns:
+            Tuple of (seconds to wait, reservation number)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= tokens
+            self._reservations += 1
+            if self._tokens >= 0:
+                return 0.0, self._reservations
+            return -self._tokens / self.rate, self._reservations
+
+    def _refund(self, tokens: float, reservation: int):
+        """
+        Give back the tokens of a reservation that will not be used
+
+        Only the latest reservation can be refunded: later callers have
+        already been given wait times that count on it, and refunding an
+        earlier one would let the next caller start alongside them.
+        """
+        with self._lock:
+            if reservation != self._reservations:
+                return
+            self._reservations -= 1
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """
+        Wait until the requested tokens are available
+
+        Reservations are taken under the lock, so concurrent callers are
+        served in arrival order with the configured spacing between them.
+        A wait cancelled while it is the latest reservation gives its
+        tokens back (see _refund), so callers that give up do not delay
+        later ones.
+        """
+        wait, reservation = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(tokens, reservation)
+                raise
+
+
+# arXiv asks clients for no more than one request every 3 seconds.
+# This bucket is shared by every job running in the process.
+arxiv_limiter = TokenBucket(rate=1.0 / float(os.getenv("ARXIV_MIN_INTERVAL", "3.0")))
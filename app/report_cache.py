@@ -0,0 +1,159 @@
+"""
+Content-addressed cache of generated reports
+Keys cover every prompt input, so a report is reused only when the same
+normalized query meets the same papers (at the same versions) under the
+same model settings and prompt template
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+
+def report_cache_key(normalized_query: str, source_ids: List[Union[str, Tuple]], model: str,
+                     temperature: float, max_tokens: int, template_version: Union[int, Tuple]) -> str:
+    """
+    Hash of the prompt inputs
+
+    Args:
+        normalized_query: Query after normalize_query
+        source_ids: Versioned arXiv IDs of the prompt papers, in prompt order,
+                    or (source number, ID) pairs where numbers are not
+                    implied by the order
+        model: Groq model name
+        temperature: Sampling temperature
+        max_tokens: Completion token limit
+        template_version: Version of the report prompt template, or a
+                          tuple with the mode, version and packing settings
+    """
+    material = json.dumps(
+        [template_version, normalized_query, source_ids, model, temperature, max_tokens]
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, db_path: str, ttl: float = 86400, max_bytes: int = 50 * 1024 * 1024):
+        """
+        Initialize report cache
+
+        Args:
+            db_path: SQLite file holding the reports
+            ttl: Seconds a report stays valid
+            max_bytes: Total report size kept; least recently used reports
+                       are evicted beyond it
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evicted': 0,
+            'generate_seconds_saved': 0.0
+        }
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                key TEXT PRIMARY KEY,
+                report TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                generate_seconds REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS reports_last_used ON reports (last_used)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a report
+
+        Args:
+            key: Key from report_cache_key
+
+        Returns:
+            Cached report, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT report, generate_seconds FROM reports WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._db.execute("UPDATE reports SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._stats['hits'] += 1
+            self._stats['generate_seconds_saved'] += row[1]
+        return row[0]
+
+    def put(self, key: str, report: str, generate_seconds: float):
+        """
+        Store a report and evict expired or least recently used ones
+
+        Args:
+            key: Key from report_cache_key
+            report: Complete report text
+            generate_seconds: Time the generation took
+        """
+        now = time.time()
+        size = len(report.encode())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO reports "
+                "(key, report, size, generate_seconds, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, report, size, generate_seconds, now, now)
+            )
+            evicted = self._db.execute(
+                "DELETE FROM reports WHERE created_at <= ?", (now - self.ttl,)
+            ).rowcount
+
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                victims = []
+                for victim, victim_size in self._db.execute(
+                    "SELECT key, size FROM reports ORDER BY last_used"
+                ):
+                    if excess <= 0:
+                        break
+                    victims.append((victim,))
+                    excess -= victim_size
+                self._db.executemany("DELETE FROM reports WHERE key = ?", victims)
+                evicted += len(victims)
+
+            self._db.commit()
+            self._stats['evicted'] += evicted
+
+    def stats(self) -> Dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports"
+            ).fetchone()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['generate_seconds_saved'] = round(stats['generate_seconds_saved'], 2)
+        stats['entries'] = entries
+        stats['bytes'] = size
+        return stats
+
+
+# Shared by every job in the process
+report_cache = ReportCache(
+    db_path=os.getenv("REPORT_CACHE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "reports.sqlite")),
+    ttl=float(os.getenv("REPORT_CACHE_TTL", "86400")),
+    max_bytes=int(os.getenv("REPORT_CACHE_MAX_MB", "50")) * 1024 * 1024
+)
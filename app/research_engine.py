@@ -1,15 +1,73 @@
 """
 Research Engine with Qdrant for semantic search
 Prioritizes most recent papers from arXiv
+
+Holds the settings, the Qdrant client and embedding model, and the
+CPU-side helpers (query and prompt building, ranking, result shaping)
+that AsyncResearchPipeline runs research jobs with
 """
 import os
-import requests
-from typing import List, Dict
+import time
+import threading
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    PointStruct, PayloadSchemaType, Prefetch, FormulaQuery,
+    SumExpression, MultExpression, ExpDecayExpression, DecayParamsExpression,
+    Filter, FieldCondition, MatchAny, Range
+)
 from fastembed import TextEmbedding
 
+from app.arxiv_parser import canonical_arxiv_id, paper_point_id, published_timestamp
+from app.query_utils import normalize_query
+from app.embedding_cache import EmbeddingCache
+from app.embedding_service import EmbeddingService
+from app.groq_stream import ReportStream, cached_metrics, groq_stats
+from app.report_cache import report_cache_key
+from app.semantic_cache import SemanticHit
+from app.collection_config import CollectionConfig
+from app.local_retrieval import rank_candidates
+from app.context_packer import ContextPacker
+from app.map_reduce import MAP_PROMPT_VERSION, REDUCE_PROMPT_VERSION, MAP_TOKENS_PER_PAPER
+from app.paper_digests import digest_store, paper_key, extractive_digest, digest_content
+
+# Bump when the report prompt changes so cached reports are not reused
+REPORT_PROMPT_VERSION = 2
+# Most papers included in the report prompt
+REPORT_PROMPT_DOCS = 6
+# Payload fields indexed for server-side filtering and scoring
+PAYLOAD_INDEXES = {
+    'published_ts': PayloadSchemaType.FLOAT,
+    'categories': PayloadSchemaType.KEYWORD,
+    'source': PayloadSchemaType.KEYWORD,
+    'paper_id': PayloadSchemaType.KEYWORD
+}
+
+
+class LockedQdrant:
+    """
+    Embedded (local mode) Qdrant client whose calls run one at a time
+
+    QdrantLocal is not thread-safe, and the client is shared by the
+    engine's threads and the async pipeline's to_thread calls, so every
+    method call holds one lock.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self.client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return call
+
 
 class ResearchEngine:
     def __init__(self):
@@ -21,38 +79,147 @@ class ResearchEngine:
         if not self.groq_api_key:
             raise ValueError("GROQ_API_KEY not configured in .env")
         print("Groq API Key configured")
+        self.groq_url = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+        self.groq_model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+        # Stream completions so partial reports survive timeouts
+        self.groq_stream = os.getenv("GROQ_STREAM", "true").lower() == "true"
+        self.groq_timeout = float(os.getenv("GROQ_TIMEOUT", "60"))
+        # Times a rate-limited call is queued again before giving up
+        self.groq_rate_limit_retries = int(os.getenv("GROQ_RATE_LIMIT_RETRIES", "3"))
+        # Paper context is packed into CONTEXT_TOKEN_BUDGET tokens, counted
+        # with CONTEXT_TOKENIZER (a local Hugging Face tokenizer) if set
+        self.context_packer = ContextPacker(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200")),
+            max_docs=REPORT_PROMPT_DOCS,
+            tokenizer_name=os.getenv("CONTEXT_TOKENIZER")
+        )
+        # "single" packs the top papers into one prompt; "map_reduce"
+        # summarizes REPORT_MAP_SOURCES papers in groups of
+        # REPORT_MAP_GROUP_SIZE and merges the notes into the report
+        self.report_mode = os.getenv("REPORT_MODE", "single").lower()
+        if self.report_mode not in ("single", "map_reduce"):
+            raise ValueError(f"Unknown REPORT_MODE '{self.report_mode}', expected 'single' or 'map_reduce'")
+        self.map_group_size = int(os.getenv("REPORT_MAP_GROUP_SIZE", "6"))
+        if self.report_mode == "map_reduce":
+            self.report_top_k = int(os.getenv("REPORT_MAP_SOURCES", "40"))
+            self.report_sources = self.report_top_k
+        else:
+            self.report_top_k = 10
+            self.report_sources = 8
+        # "abstract" sends packed abstracts; "digest" sends each paper's
+        # stored digest and key claims, built once per arXiv version
+        # (extractive, or by Groq with DIGEST_MODE=llm)
+        self.report_context = os.getenv("REPORT_CONTEXT", "abstract").lower()
+        if self.report_context not in ("abstract", "digest"):
+            raise ValueError(f"Unknown REPORT_CONTEXT '{self.report_context}', expected 'abstract' or 'digest'")
+        self.digest_mode = os.getenv("DIGEST_MODE", "extractive").lower()
+        if self.digest_mode not in ("extractive", "llm"):
+            raise ValueError(f"Unknown DIGEST_MODE '{self.digest_mode}', expected 'extractive' or 'llm'")
+        self.digest_max_tokens = int(os.getenv("DIGEST_MAX_TOKENS", "80"))
+        # Bounds concurrent map calls across jobs; admission is still
+        # paced by the Groq scheduler
+        self.map_concurrency = int(os.getenv("REPORT_MAP_CONCURRENCY", "4"))
         
-        # Qdrant Cloud Client
-        qdrant_host = os.getenv("QDRANT_HOST")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
+        # arXiv fetch settings (page size is capped by the API at 2000)
+        self.arxiv_url = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+        self.arxiv_max_results = int(os.getenv("ARXIV_MAX_RESULTS", "20"))
+        self.arxiv_page_size = min(int(os.getenv("ARXIV_PAGE_SIZE", "100")), 2000)
+        # Pages requested ahead of the one being consumed
+        self.arxiv_page_lookahead = max(int(os.getenv("ARXIV_PAGE_LOOKAHEAD", "2")), 1)
         
-        if not qdrant_host:
-            raise ValueError("QDRANT_HOST not configured in .env")
-        if not qdrant_api_key:
-            raise ValueError("QDRANT_API_KEY not configured in .env")
+        # Search ranking: similarity plus a recency bonus that halves every
+        # RECENCY_HALF_LIFE_DAYS, computed by Qdrant over every candidate
+        # above the relevance threshold
+        self.min_relevance = float(os.getenv("SEARCH_MIN_RELEVANCE", "0.3"))
+        self.recency_weight = float(os.getenv("RECENCY_WEIGHT", "0.3"))
+        self.recency_half_life_days = float(os.getenv("RECENCY_HALF_LIFE_DAYS", "180"))
+        self.search_candidates = int(os.getenv("SEARCH_CANDIDATES", "1000"))
+        # "qdrant" searches the shared corpus; "local" ranks each job's
+        # fetched papers in process and writes to Qdrant in the background
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "qdrant").lower()
+        if self.retrieval_mode not in ("qdrant", "local"):
+            raise ValueError(f"Unknown RETRIEVAL_MODE '{self.retrieval_mode}', expected 'qdrant' or 'local'")
+        
+        # Quantization, on-disk vectors and HNSW settings for research_docs
+        self.collection_config = CollectionConfig.from_env()
+        
+        # Qdrant backend: "remote" (Qdrant Cloud or a server) or "local",
+        # the client's embedded mode storing under QDRANT_PATH
+        # (":memory:" keeps everything in RAM)
+        self.qdrant_mode = os.getenv("QDRANT_MODE", "remote").lower()
+        if self.qdrant_mode not in ("remote", "local"):
+            raise ValueError(f"Unknown QDRANT_MODE '{self.qdrant_mode}', expected 'remote' or 'local'")
+        self.qdrant_path = os.getenv(
+            "QDRANT_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "qdrant")
+        )
+        
+        if self.qdrant_mode == "remote":
+            qdrant_host = os.getenv("QDRANT_HOST")
+            qdrant_api_key = os.getenv("QDRANT_API_KEY")
+            
+            if not qdrant_host:
+                raise ValueError("QDRANT_HOST not configured in .env")
+            if not qdrant_api_key:
+                raise ValueError("QDRANT_API_KEY not configured in .env")
+            
+            # Kept for the async pipeline, which opens its own client
+            self.qdrant_url = f"https://{qdrant_host}"
+            self.qdrant_api_key = qdrant_api_key
+            # gRPC sends vectors as packed floats instead of JSON
+            self.qdrant_prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+            self.qdrant_grpc_port = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+            self.qdrant_timeout = int(os.getenv("QDRANT_TIMEOUT", "60"))
         
         try:
-            print(f"Connecting to Qdrant Cloud: {qdrant_host}")
+            if self.qdrant_mode == "remote":
+                transport = "gRPC" if self.qdrant_prefer_grpc else "REST"
+                print(f"Connecting to Qdrant Cloud: {qdrant_host} ({transport})")
+            else:
+                print(f"Opening local Qdrant storage: {self.qdrant_path}")
             
-            self.qdrant = QdrantClient(
-                url=f"https://{qdrant_host}",
-                api_key=qdrant_api_key,
-                timeout=60,
-                prefer_grpc=False
-            )
+            self.qdrant = QdrantClient(**self.qdrant_client_options())
+            if self.qdrant_mode == "local":
+                self.qdrant = LockedQdrant(self.qdrant)
             
             collections = self.qdrant.get_collections()
-            print(f"Qdrant Cloud connected successfully")
+            print(f"Qdrant connected successfully")
             print(f"Existing collections: {len(collections.collections)}")
             
         except Exception as e:
-            print(f"Error connecting to Qdrant Cloud: {e}")
+            print(f"Error connecting to Qdrant: {e}")
             raise
         
         # Embedding model with FastEmbed
         print("Loading embedding model with FastEmbed...")
         try:
-            self.encoder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+            model_name = "BAAI/bge-small-en-v1.5"
+            
+            # Optionally run the model in worker processes shared by all jobs
+            embedding_workers = int(os.getenv("EMBEDDING_WORKERS", "0"))
+            if embedding_workers > 0:
+                self.embedding_service = EmbeddingService(
+                    model_name=model_name,
+                    workers=embedding_workers,
+                    max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                    max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "10")),
+                    timeout=float(os.getenv("EMBEDDING_TIMEOUT", "60"))
+                )
+                model = self.embedding_service
+                print(f"Embedding service started with {embedding_workers} worker processes")
+            else:
+                self.embedding_service = None
+                model = TextEmbedding(model_name=model_name)
+            
+            # Content-hash cache so repeated abstracts skip the model
+            self.encoder = EmbeddingCache(
+                model,
+                model_name=model_name,
+                db_path=os.getenv(
+                    "EMBEDDING_CACHE_PATH",
+                    os.path.join(os.getenv("DATA_DIR", "data"), "embeddings.sqlite")
+                ),
+                memory_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+            )
             print("FastEmbed model loaded")
         except Exception as e:
             print(f"Error loading model: {e}")
@@ -61,197 +228,285 @@ class ResearchEngine:
         self._setup_collection()
         print("Research Engine ready")
     
+    def qdrant_client_options(self) -> Dict:
+        """
+        Connection settings shared by the sync and async Qdrant clients
+        
+        Each client is created once per process and shared by every job,
+        so its HTTP pool or gRPC channel is reused across requests.
+        In local mode the storage is locked by the sync client, which the
+        async pipeline then shares.
+        """
+        if self.qdrant_mode == "local":
+            if self.qdrant_path == ":memory:":
+                return {'location': ':memory:'}
+            return {'path': self.qdrant_path}
+        return {
+            'url': self.qdrant_url,
+            'api_key': self.qdrant_api_key,
+            'timeout': self.qdrant_timeout,
+            'prefer_grpc': self.qdrant_prefer_grpc,
+            'grpc_port': self.qdrant_grpc_port,
+            # Keep idle channels open between jobs
+            'grpc_options': {
+                'grpc.keepalive_time_ms': 30000,
+                'grpc.keepalive_permit_without_calls': 1
+            }
+        }
+    
     def _setup_collection(self):
-        """Create Qdrant collection if it doesn't exist"""
+        """
+        Create Qdrant collection if it doesn't exist
+        On a server, an existing collection is migrated in place to the
+        configured quantization, on-disk and HNSW settings
+        """
         collection_name = "research_docs"
+        print(f"Collection settings: {self.collection_config.describe()}")
         
-        try:
-            self.qdrant.get_collection(collection_name)
+        if self.qdrant.collection_exists(collection_name):
             print(f"Collection '{collection_name}' already exists")
-        except:
-            self.qdrant.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=384,
-                    distance=Distance.COSINE
-                )
-            )
+            existed = True
+        else:
+            self.collection_config.create(self.qdrant, collection_name)
             print(f"Collection '{collection_name}' created")
+            existed = False
+        
+        # Local mode searches by brute force: no index to migrate or build
+        if self.qdrant_mode == "local":
+            return
+        
+        if existed:
+            try:
+                self.collection_config.migrate(self.qdrant, collection_name)
+            except Exception as e:
+                print(f"Error migrating collection: {e}")
+        
+        # Indexed fields are filtered during HNSW traversal instead of
+        # after it; creating an existing index is a no-op
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            try:
+                self.qdrant.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+            except Exception as e:
+                print(f"Error creating payload index on '{field_name}': {e}")
     
-    def fetch_arxiv_papers(self, query: str, max_results: int = 20) -> List[Dict]:
+    def _plan_arxiv_pages(self, max_results: int, page_size: int) -> List[Tuple[int, int]]:
         """
-        Fetch recent papers from arXiv API
-        Sorted by most recent submission date
+        Split a result window into (start, size) pages
         
         Args:
-            query: Search term
-            max_results: Maximum number of results
+            max_results: Total number of results wanted
+            page_size: Maximum results per request
             
         Returns:
-            List of papers with title, summary, URL, and publication date
+            List of (start, size) windows covering max_results
         """
-        print(f"Searching papers in arXiv: '{query}'")
-        
-        base_url = "http://export.arxiv.org/api/query"
-        params = {
+        return [
+            (start, min(page_size, max_results - start))
+            for start in range(0, max_results, page_size)
+        ]
+    
+    def _arxiv_params(self, query: str, start: int, size: int) -> Dict:
+        """Query parameters for one page of arXiv results"""
+        return {
             'search_query': f'all:{query}',
-            'start': 0,
-            'max_results': max_results,
+            'start': start,
+            'max_results': size,
             'sortBy': 'submittedDate',
             'sortOrder': 'descending'
         }
+    
+    def _pending_documents(self, documents: List[Dict], stored: List) -> Dict[str, Dict]:
+        """
+        Select documents that still need embedding
         
-        try:
-            response = requests.get(base_url, params=params, timeout=15)
-            response.raise_for_status()
-            
-            papers = []
-            entries = response.text.split('<entry>')
-            
-            for entry in entries[1:]:
-                try:
-                    title = entry.split('<title>')[1].split('</title>')[0].strip()
-                    title = ' '.join(title.split())
-                    
-                    summary = entry.split('<summary>')[1].split('</summary>')[0].strip()
-                    summary = ' '.join(summary.split())[:800]
-                    
-                    link = entry.split('<id>')[1].split('</id>')[0].strip()
-                    
-                    # Extract publication date
-                    published = entry.split('<published>')[1].split('</published>')[0].strip()
-                    pub_date = published.split('T')[0]  # Format: YYYY-MM-DD
-                    
-                    papers.append({
-                        'title': title,
-                        'content': summary,
-                        'url': link,
-                        'source': 'arXiv',
-                        'published_date': pub_date
-                    })
-                except:
-                    continue
-            
-            # Sort by date (most recent first)
-            papers.sort(key=lambda x: x['published_date'], reverse=True)
-            
-            print(f"Found {len(papers)} papers")
-            if papers:
-                print(f"Date range: {papers[-1]['published_date']} to {papers[0]['published_date']}")
-            
-            return papers
+        Args:
+            documents: Candidate documents
+            stored: Points already in Qdrant for their IDs
             
-        except Exception as e:
-            print(f"Error searching arXiv: {e}")
-            return []
+        Returns:
+            Dict of point ID -> document for new or re-versioned papers
+        """
+        # Points stored before published_ts existed are re-stored once
+        stored_versions = {
+            str(point.id): point.payload.get('arxiv_id') or point.payload.get('url')
+            for point in stored
+            if 'published_ts' in point.payload
+        }
+        pending = {}
+        for doc in documents:
+            point_id = paper_point_id(doc)
+            if stored_versions.get(point_id) != (doc.get('arxiv_id') or doc['url']):
+                pending[point_id] = doc
+        return pending
+    
+    def _build_points(self, pending: Dict[str, Dict], embeddings: List) -> List[PointStruct]:
+        """Build Qdrant points with the paper metadata as payload"""
+        points = []
+        for (point_id, doc), embedding in zip(pending.items(), embeddings):
+            points.append(PointStruct(
+                id=point_id,
+                vector=embedding.tolist(),
+                payload={
+                    'title': doc['title'],
+                    'content': doc['content'],
+                    'url': doc['url'],
+                    'source': doc.get('source', 'unknown'),
+                    'published_date': doc.get('published_date', 'unknown'),
+                    'published_ts': published_timestamp(doc),
+                    'updated_date': doc.get('updated_date'),
+                    'arxiv_id': doc.get('arxiv_id'),
+                    'paper_id': canonical_arxiv_id(doc['arxiv_id']) if doc.get('arxiv_id') else None,
+                    'authors': doc.get('authors', []),
+                    'categories': doc.get('categories', [])
+                }
+            ))
+        return points
     
-    def store_in_qdrant(self, documents: List[Dict]):
+    def _search_filter(self, filters: Optional[Dict]) -> Optional[Filter]:
         """
-        Store documents in Qdrant with embeddings
-        Includes publication date in metadata
+        Qdrant filter for search filters
         
         Args:
-            documents: List of documents with title, content, URL, and date
+            filters: Optional dict with 'date_from' and 'date_to'
+                     (YYYY-MM-DD, inclusive), 'categories' and 'sources'
+                     (lists; a paper matches if it has any of them)
+            
+        Returns:
+            Filter on the indexed payload fields, or None for no filters
         """
-        if not documents:
-            print("No documents to store")
-            return
+        if not filters:
+            return None
         
-        print(f"Storing {len(documents)} documents in Qdrant...")
+        must = []
+        published = {}
+        if filters.get('date_from'):
+            published['gte'] = published_timestamp({'published_date': filters['date_from']})
+        if filters.get('date_to'):
+            published['lt'] = published_timestamp({'published_date': filters['date_to']}) + 86400
+        if published:
+            must.append(FieldCondition(key='published_ts', range=Range(**published)))
+        if filters.get('categories'):
+            must.append(FieldCondition(key='categories', match=MatchAny(any=list(filters['categories']))))
+        if filters.get('sources'):
+            must.append(FieldCondition(key='source', match=MatchAny(any=list(filters['sources']))))
         
-        try:
-            texts = [f"{doc['title']} {doc['content']}" for doc in documents]
-            embeddings = list(self.encoder.embed(texts))
-            
-            points = []
-            for idx, (doc, embedding) in enumerate(zip(documents, embeddings)):
-                points.append(PointStruct(
-                    id=idx,
-                    vector=embedding.tolist(),
-                    payload={
-                        'title': doc['title'],
-                        'content': doc['content'],
-                        'url': doc['url'],
-                        'source': doc.get('source', 'unknown'),
-                        'published_date': doc.get('published_date', 'unknown')
-                    }
-                ))
-            
-            self.qdrant.upsert(collection_name="research_docs", points=points)
-            print(f"{len(points)} documents stored successfully")
-            
-        except Exception as e:
-            print(f"Error storing in Qdrant: {e}")
+        return Filter(must=must) if must else None
     
-    def search_relevant_docs(self, query: str, top_k: int = 12) -> List[Dict]:
+    def _recency_query(self, query_vector: List[float], top_k: int,
+                       filters: Optional[Dict] = None) -> Dict:
         """
-        Search relevant documents using semantic similarity
-        Returns results sorted by combination of relevance and recency
+        query_points arguments ranking by similarity plus recency
+        
+        The prefetch collects every point above the relevance threshold
+        (up to search_candidates) that passes the filters; Qdrant then
+        rescores them as similarity + weight * 0.5 ** (age / half-life)
+        and returns the exact top_k of that combined score.
         
         Args:
-            query: User search query
+            query_vector: Query embedding
             top_k: Number of results to return
+            filters: Optional search filters (see _search_filter)
             
         Returns:
-            List of most relevant recent documents
+            Keyword arguments for QdrantClient.query_points
+        """
+        return {
+            'collection_name': "research_docs",
+            'prefetch': Prefetch(
+                query=query_vector,
+                filter=self._search_filter(filters),
+                params=self.collection_config.search_params(),
+                limit=max(self.search_candidates, top_k),
+                score_threshold=self.min_relevance
+            ),
+            'query': FormulaQuery(
+                formula=SumExpression(sum=[
+                    "$score",
+                    MultExpression(mult=[
+                        self.recency_weight,
+                        # Decays to midpoint 0.5 at one half-life from now
+                        ExpDecayExpression(exp_decay=DecayParamsExpression(
+                            x="published_ts",
+                            target=time.time(),
+                            scale=self.recency_half_life_days * 86400,
+                            midpoint=0.5
+                        ))
+                    ])
+                ]),
+                # Papers without a date get no recency bonus
+                defaults={"published_ts": 0}
+            ),
+            'limit': top_k,
+            'with_payload': True
+        }
+    
+    def _format_hits(self, results: List) -> List[Dict]:
         """
-        print(f"Searching relevant documents for: '{query}'")
+        Convert ranked search hits to documents
         
-        try:
-            query_embedding = list(self.encoder.embed([query]))[0]
-            
-            # Get more results to allow for recency filtering
-            results = self.qdrant.search(
-                collection_name="research_docs",
-                query_vector=query_embedding.tolist(),
-                limit=top_k * 2
-            )
-            
-            relevant_docs = []
-            for hit in results:
-                relevant_docs.append({
-                    'title': hit.payload['title'],
-                    'content': hit.payload['content'],
-                    'url': hit.payload['url'],
-                    'source': hit.payload['source'],
-                    'published_date': hit.payload.get('published_date', 'unknown'),
-                    'relevance_score': hit.score
-                })
-            
-            # Sort by date (most recent first) while maintaining relevance threshold
-            relevant_docs = [doc for doc in relevant_docs if doc['relevance_score'] > 0.3]
-            relevant_docs.sort(key=lambda x: x['published_date'], reverse=True)
-            
-            # Return top_k most recent papers
-            final_docs = relevant_docs[:top_k]
-            
-            print(f"Found {len(final_docs)} relevant recent documents")
-            if final_docs:
-                print(f"Date range: {final_docs[-1]['published_date']} to {final_docs[0]['published_date']}")
+        Args:
+            results: Qdrant scored points, best first
             
-            return final_docs
+        Returns:
+            List of most relevant recent documents
+        """
+        relevant_docs = [
+            {
+                'title': hit.payload['title'],
+                'content': hit.payload['content'],
+                'url': hit.payload['url'],
+                'source': hit.payload['source'],
+                'published_date': hit.payload.get('published_date', 'unknown'),
+                'arxiv_id': hit.payload.get('arxiv_id'),
+                'relevance_score': hit.score
+            }
+            for hit in results
+        ]
+        
+        print(f"Found {len(relevant_docs)} relevant recent documents")
+        return relevant_docs
+    
+    def _rank_fetched(self, query_vector, papers: List[Dict], vectors: List, top_k: int = 12,
+                      filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Rank a job's fetched papers by their embeddings
+        Same scoring as the Qdrant search, restricted to these papers
+        
+        Args:
+            query_vector: Query embedding
+            papers: Papers fetched for this job
+            vectors: Paper embeddings, in paper order
+            top_k: Number of results to return
+            filters: Optional date range, category and source filters
             
-        except Exception as e:
-            print(f"Error in semantic search: {e}")
-            return []
+        Returns:
+            List of most relevant recent documents
+        """
+        ranked = rank_candidates(
+            query_vector, papers, vectors, top_k,
+            self.min_relevance, self.recency_weight, self.recency_half_life_days, filters
+        )
+        print(f"Found {len(ranked)} relevant recent documents")
+        return ranked
     
-    def generate_report(self, query: str, documents: List[Dict]) -> str:
+    def _build_report_prompt(self, query: str, documents: List[Dict]) -> str:
         """
-        Generate research report using Groq API
-        Highlights recency of papers in the report
+        Build the report prompt from the query and retrieved documents
         
         Args:
             query: Research question
-            documents: List of relevant documents
+            documents: Documents packed by ContextPacker.pack
             
         Returns:
-            Report in text format
+            Prompt text
         """
-        print("Generating report with Groq API...")
-        
-        # Prepare context with top 6 documents, emphasizing dates
+        # Prepare context with top documents, emphasizing dates
         context_parts = []
-        for i, doc in enumerate(documents[:6], 1):
+        for i, doc in enumerate(documents, 1):
             context_parts.append(
                 f"[{i}] Title: {doc['title']}\n"
                 f"Published: {doc['published_date']}\n"
@@ -261,7 +516,7 @@ class ResearchEngine:
         
         context = "\n".join(context_parts)
         
-        prompt = f"""You are an expert research assistant specializing in academic literature review.
+        return f"""You are an expert research assistant specializing in academic literature review.
 
 RESEARCH QUESTION:
 {query}
@@ -279,102 +534,122 @@ INSTRUCTIONS:
 7. DO NOT invent information not present in the sources
 
 REPORT:"""
+    
+    def _groq_headers(self) -> Dict:
+        return {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _groq_payload(self, prompt: str, stream: bool = False, max_tokens: int = 1500) -> Dict:
+        """Chat-completions request body for a report prompt"""
+        return {
+            "model": self.groq_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.3,
+            "stream": stream
+        }
+    
+    def _report_key(self, query: str, documents: List[Dict],
+                    template_version=REPORT_PROMPT_VERSION) -> str:
+        """
+        Report cache key for the prompt built from these packed documents
         
-        try:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.groq_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "max_tokens": 1500,
-                    "temperature": 0.3
-                },
-                timeout=60
-            )
-            
-            if response.status_code != 200:
-                print(f"Status Code: {response.status_code}")
-                print(f"Response: {response.text}")
-            
-            response.raise_for_status()
-            
-            data = response.json()
-            report = data['choices'][0]['message']['content']
-            
-            print("Report generated successfully")
-            return report
-            
-        except requests.exceptions.HTTPError as e:
-            error_msg = f"HTTP Error {response.status_code}"
-            try:
-                error_detail = response.json()
-                print(f"Error detail: {error_detail}")
-                error_msg = error_detail.get('error', {}).get('message', str(e))
-            except:
-                error_msg = str(e)
-            
-            print(f"Error in Groq API request: {error_msg}")
-            return f"Error generating report: {error_msg}"
-            
-        except requests.exceptions.Timeout:
-            print("Timeout generating report")
-            return "Error: AI service took too long to respond. Please try again."
-            
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            return f"Error generating report: {str(e)}"
+        The packing budget and tokenizer decide which sentences survive,
+        so they are keyed with the template version.
+        """
+        payload = self._groq_payload("")
+        return report_cache_key(
+            normalize_query(query),
+            [doc.get('arxiv_id') or doc['url'] for doc in documents],
+            payload['model'],
+            payload['temperature'],
+            payload['max_tokens'],
+            (template_version, self.context_packer.token_budget, self.context_packer.tokenizer_name)
+        )
     
-    def run_full_research(self, query: str) -> Dict:
+    def _reduce_key(self, query: str, notes: List[Tuple[int, Dict, str]]) -> str:
         """
-        Execute complete research pipeline
+        Report cache key of a reduce prompt
         
+        Notes keep their source numbers from the full source list, so the
+        (number, paper) pairs are keyed: the same papers under other
+        numbers produce a report with different citations.
+        """
+        payload = self._groq_payload("")
+        return report_cache_key(
+            normalize_query(query),
+            [(number, doc.get('arxiv_id') or doc['url']) for number, doc, _ in notes],
+            payload['model'],
+            payload['temperature'],
+            payload['max_tokens'],
+            ('map_reduce', REDUCE_PROMPT_VERSION)
+        )
+    
+    def _map_key(self, query: str, doc: Dict) -> str:
+        """Map note cache key of one paper"""
+        payload = self._groq_payload("")
+        return report_cache_key(
+            normalize_query(query),
+            [doc.get('arxiv_id') or doc['url']],
+            payload['model'],
+            payload['temperature'],
+            MAP_TOKENS_PER_PAPER,
+            ('map', MAP_PROMPT_VERSION)
+        )
+    
+    def _uses_map_reduce(self, documents: List[Dict]) -> bool:
+        return self.report_mode == "map_reduce" and len(documents) > REPORT_PROMPT_DOCS
+    
+    def _apply_digests(self, documents: List[Dict], digests: Dict) -> List[Dict]:
+        """Swap abstracts for digests, building extractive ones for any gaps"""
+        extracted = {
+            paper_key(doc): extractive_digest(doc, self.context_packer.count_tokens, self.digest_max_tokens)
+            for doc in documents
+            if paper_key(doc) not in digests
+        }
+        if extracted:
+            digest_store.put_many(extracted, "extractive")
+        digests = dict(digests, **extracted)
+        
+        condensed = []
+        abstract_tokens = digest_tokens = 0
+        for doc in documents:
+            content = digest_content(*digests[paper_key(doc)])
+            abstract_tokens += self.context_packer.count_tokens(doc['content'])
+            digest_tokens += self.context_packer.count_tokens(content)
+            condensed.append(dict(doc, content=content))
+        digest_store.record_savings(abstract_tokens, digest_tokens)
+        return condensed
+    
+    def _record_generation(self, stream: ReportStream) -> Dict:
+        metrics = stream.metrics()
+        groq_stats.record(metrics)
+        print(f"Generation: first token {metrics['first_token']}s, "
+              f"{metrics['tokens']} tokens at {metrics['tokens_per_sec']} tokens/s")
+        return metrics
+    
+    def _semantic_result(self, hit: SemanticHit, timings: Dict) -> Dict:
+        """
+        Result for a query answered from the semantic cache
+
         Args:
-            query: User research question
-            
+            hit: Matching past run
+            timings: Timings measured so far
+
         Returns:
-            Dict with report, sources, and statistics
+            The past run's result with its own generation metrics and timings
         """
-        print(f"\n{'='*60}")
-        print(f"STARTING RESEARCH: {query}")
-        print(f"{'='*60}\n")
-        
-        # Fetch papers (increased to 20 for better recency filtering)
-        papers = self.fetch_arxiv_papers(query, max_results=20)
-        
-        if not papers:
-            return {
-                'status': 'error',
-                'message': 'No papers found in arXiv',
-                'report': None,
-                'sources': []
-            }
-        
-        # Store in Qdrant
-        self.store_in_qdrant(papers)
-        
-        # Semantic search with recency priority
-        relevant = self.search_relevant_docs(query, top_k=10)
-        
-        # Generate report
-        report = self.generate_report(query, relevant)
-        
-        print(f"\n{'='*60}")
-        print("RESEARCH COMPLETED")
-        print(f"{'='*60}\n")
-        
-        return {
-            'status': 'success',
-            'report': report,
-            'sources': relevant[:8],
-            'total_papers': len(papers),
-            'relevant_papers': len(relevant)
-        }
\ No newline at end of file
+        timings['saved'] = hit.research_seconds
+        return dict(
+            hit.result,
+            generation=cached_metrics(),
+            semantic_match={'query': hit.query, 'similarity': hit.similarity},
+            timings={stage: round(seconds, 3) for stage, seconds in timings.items()}
+        )
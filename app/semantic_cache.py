@@ -0,0 +1,244 @@
+"""
+Semantic cache of completed research runs
+Past queries are embedded with the engine encoder and kept in a small
+in-memory vector index backed by SQLite; a new query whose embedding is
+close enough to a fresh past query reuses that run's sources and report
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class SemanticHit:
+    query: str
+    similarity: float
+    result: Dict
+    research_seconds: float
+
+
+class SemanticQueryCache:
+    def __init__(self, db_path: str, threshold: float = 0.92, ttl: float = 21600,
+                 max_entries: int = 5000):
+        """
+        Initialize semantic query cache
+
+        Args:
+            db_path: SQLite file holding past queries and their results
+            threshold: Minimum cosine similarity for a query to reuse a result
+            ttl: Seconds a result stays fresh; recency matters to reports,
+                 so this is shorter than the report cache TTL
+            max_entries: Past queries kept; the oldest are evicted beyond it
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evicted': 0,
+            'research_seconds_saved': 0.0
+        }
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # AUTOINCREMENT never reuses IDs, so rows past the highest ID seen
+        # are exactly the ones written since (by any process)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(queries)")}
+        if columns and 'id' not in columns:
+            # Tables created before the index was refreshed incrementally
+            self._db.execute("ALTER TABLE queries RENAME TO queries_unnumbered")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS queries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL UNIQUE,
+                vector BLOB NOT NULL,
+                result TEXT NOT NULL,
+                research_seconds REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        if columns and 'id' not in columns:
+            self._db.execute(
+                "INSERT INTO queries (query, vector, result, research_seconds, created_at) "
+                "SELECT query, vector, result, research_seconds, created_at "
+                "FROM queries_unnumbered ORDER BY created_at"
+            )
+            self._db.execute("DROP TABLE queries_unnumbered")
+        self._db.commit()
+
+        # Vector index: unit-norm rows, so cosine similarity is a dot
+        # product. Rows are kept in preallocated buffers; removals move
+        # the last row into the gap
+        self._slots: Dict[str, int] = {}
+        self._queries: List[str] = []
+        self._created = np.zeros(0, dtype=np.float64)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._watermark = 0
+        self._refresh()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _add(self, query: str, vector: np.ndarray, created_at: float):
+        """Add or replace one entry in the in-memory index"""
+        slot = self._slots.get(query)
+        if slot is None:
+            slot = len(self._queries)
+            if slot == len(self._created):
+                capacity = max(2 * slot, 64)
+                vectors = np.zeros((capacity, len(vector)), dtype=np.float32)
+                if slot:
+                    vectors[:slot] = self._vectors[:slot]
+                created = np.zeros(capacity, dtype=np.float64)
+                created[:slot] = self._created[:slot]
+                self._vectors, self._created = vectors, created
+            self._slots[query] = slot
+            self._queries.append(query)
+        self._vectors[slot] = vector
+        self._created[slot] = created_at
+
+    def _remove(self, query: str):
+        """Drop one entry from the in-memory index"""
+        slot = self._slots.pop(query)
+        last = len(self._queries) - 1
+        moved = self._queries.pop()
+        if slot != last:
+            self._queries[slot] = moved
+            self._slots[moved] = slot
+            self._vectors[slot] = self._vectors[last]
+            self._created[slot] = self._created[last]
+
+    def _evict(self, now: float):
+        """Drop expired and excess entries, oldest first, as put() does in SQLite"""
+        size = len(self._queries)
+        expired = [self._queries[slot] for slot in np.flatnonzero(self._created[:size] <= now - self.ttl)]
+        for query in expired:
+            self._remove(query)
+        excess = len(self._queries) - self.max_entries
+        if excess > 0:
+            oldest = np.argsort(self._created[:len(self._queries)])[:excess]
+            for query in [self._queries[slot] for slot in oldest]:
+                self._remove(query)
+
+    def _refresh(self):
+        """Add rows written since the last refresh, here or by other processes"""
+        now = time.time()
+        rows = self._db.execute(
+            "SELECT id, query, vector, created_at FROM queries WHERE id > ? ORDER BY id",
+            (self._watermark,)
+        ).fetchall()
+        for row_id, query, vector, created_at in rows:
+            self._watermark = row_id
+            if created_at > now - self.ttl:
+                self._add(query, np.frombuffer(vector, dtype=np.float32), created_at)
+        self._evict(now)
+
+    def lookup(self, query: str, vector) -> Optional[SemanticHit]:
+        """
+        Find a fresh past run for an equivalent query
+
+        Args:
+            query: Normalized query
+            vector: Query embedding
+
+        Returns:
+            The closest past run above the threshold, or None
+        """
+        vector = self._unit(vector)
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._refresh()
+            best = None
+            size = len(self._queries)
+            if size:
+                scores = self._vectors[:size] @ vector
+                index = int(np.argmax(scores))
+                if scores[index] >= self.threshold:
+                    best = (self._queries[index], float(scores[index]))
+
+            row = None
+            if best is not None:
+                row = self._db.execute(
+                    "SELECT result, research_seconds FROM queries WHERE query = ? AND created_at > ?",
+                    (best[0], cutoff)
+                ).fetchone()
+                if row is None:
+                    # Evicted by another process
+                    self._remove(best[0])
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['research_seconds_saved'] += row[1]
+
+        print(f"Semantic cache hit: '{query}' ~ '{best[0]}' ({best[1]:.3f})")
+        return SemanticHit(
+            query=best[0],
+            similarity=round(best[1], 4),
+            result=json.loads(row[0]),
+            research_seconds=row[1]
+        )
+
+    def put(self, query: str, vector, result: Dict, research_seconds: float):
+        """
+        Store a completed run and evict expired or excess entries
+
+        Args:
+            query: Normalized query
+            vector: Query embedding
+            result: Successful run_full_research result
+            research_seconds: Time the run took
+        """
+        vector = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries "
+                "(query, vector, result, research_seconds, created_at) VALUES (?, ?, ?, ?, ?)",
+                (query, vector.tobytes(), json.dumps(result), research_seconds, now)
+            )
+            evicted = self._db.execute(
+                "DELETE FROM queries WHERE created_at <= ?", (now - self.ttl,)
+            ).rowcount
+            evicted += self._db.execute(
+                "DELETE FROM queries WHERE query IN "
+                "(SELECT query FROM queries ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._db.commit()
+            self._stats['evicted'] += evicted
+            # Picks up the new row (and any from other processes) and
+            # applies the same eviction to the index
+            self._refresh()
+
+    def stats(self) -> Dict:
+        """Snapshot of threshold, hit rate and research time saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._queries)
+        lookups = stats['hits'] + stats['misses']
+        stats['threshold'] = self.threshold
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['research_seconds_saved'] = round(stats['research_seconds_saved'], 2)
+        return stats
+
+
+# Shared by every job in the process
+semantic_cache = SemanticQueryCache(
+    db_path=os.getenv("SEMANTIC_CACHE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "queries.sqlite")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "21600")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+)
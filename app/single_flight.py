@@ -0,0 +1,71 @@
+"""
+Single-flight coalescing of identical concurrent calls
+Concurrent callers with the same key share one execution and its result
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """Initialize with no calls in flight"""
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """
+        Await fn once per key among concurrent coroutines
+
+        The first caller for a key awaits fn; callers arriving while it
+        runs wait and receive the same result (or exception). Once the
+        call finishes the key is released, so later calls run again.
+        Callers must share one event loop.
+
+        Args:
+            key: Identity of the call; for tuple keys the first item
+                 names the stage in stats()
+            fn: Coroutine function to await
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Result of fn
+        """
+        stage = key[0] if isinstance(key, tuple) else 'call'
+        counts = self._stats.setdefault(stage, {'executed': 0, 'coalesced': 0})
+
+        call = self._calls.get(key)
+        if call is not None:
+            counts['coalesced'] += 1
+            # Shield so one cancelled waiter does not cancel the others
+            return await asyncio.shield(call)
+
+        counts['executed'] += 1
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await fn(*args, **kwargs)
+            call.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Waiters fail instead of being cancelled themselves; their
+            # own jobs were not cancelled and are retried
+            call.set_exception(RuntimeError(f"{stage} call was cancelled"))
+            call.exception()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Mark retrieved so failures without waiters are not logged
+            call.exception()
+            raise
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        """Snapshot of executed vs coalesced call counts per stage"""
+        stats = {stage: dict(counts) for stage, counts in self._stats.items()}
+        stats['in_flight'] = len(self._calls)
+        return stats
+
+
+# Shared by every job in the process
+async_research_flight = AsyncSingleFlight()
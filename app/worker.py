@@ -0,0 +1,276 @@
+"""
+Research job workers
+Lease jobs from the durable queue and run them on the async pipeline.
+Runs inside the API process or standalone:
+
+    python -m app.worker
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables before app modules read their settings
+load_dotenv()
+
+from app.research_engine import ResearchEngine
+from app.async_pipeline import AsyncResearchPipeline
+from app.email_service import send_research_report_async
+from app.job_queue import JobQueue, job_queue
+from app.single_flight import async_research_flight
+from app.query_utils import research_key, fetch_key
+from app.progress import progress_broker
+
+
+class JobError(Exception):
+    """A job failure; retryable unless stated otherwise"""
+
+    def __init__(self, message: str, retry: bool = True):
+        super().__init__(message)
+        self.retry = retry
+
+
+async def process_research_job(pipeline: AsyncResearchPipeline, job: Dict) -> Tuple[Dict, Dict]:
+    """
+    Execute the complete research for a job and email the report
+
+    Args:
+        pipeline: Async research pipeline
+        job: Leased job
+
+    Returns:
+        Tuple of (compact result to store, per-stage timings)
+
+    Raises:
+        JobError: If the research or the email failed
+    """
+    query, email = job['query'], job['email']
+    started = time.perf_counter()
+
+    # Concurrent duplicates of the same normalized query attach to one
+    # in-flight run and each get their own email
+    result = await async_research_flight.do(
+        ('research', research_key(query, job['filters'])),
+        pipeline.run_full_research, query, job['filters'], job['priority']
+    )
+
+    if result['status'] != 'success':
+        raise JobError(f"Research failed: {result.get('message')}", retry=False)
+
+    # Retry later rather than email an error message
+    if result['generation'].get('failed'):
+        raise JobError(f"Report generation failed: {result['report']}")
+
+    timings = dict(result['timings'])
+    timings['research'] = round(time.perf_counter() - started, 3)
+    timings['queue_wait'] = round(job['started_at'] - job['created_at'], 3)
+
+    email_start = time.perf_counter()
+    email_sent = await send_research_report_async(
+        pipeline.http,
+        to_email=email,
+        query=query,
+        report=result['report'],
+        sources=result['sources'],
+        # Stable across attempts, so a retried job does not email twice
+        idempotency_key=f"research-report/{job['id']}"
+    )
+    timings['email'] = round(time.perf_counter() - email_start, 3)
+
+    if not email_sent:
+        raise JobError(f"Research completed but email failed for {email}")
+
+    print(f"Complete process successful for {email}")
+
+    # Abstracts are dropped; the report and source metadata are enough
+    # to render results
+    stored = {
+        'report': result['report'],
+        'sources': [
+            {key: value for key, value in source.items() if key != 'content'}
+            for source in result['sources']
+        ],
+        'total_papers': result['total_papers'],
+        'relevant_papers': result['relevant_papers'],
+        'generation': result['generation'],
+        'embedding': result['embedding']
+    }
+    return stored, timings
+
+
+class WorkerPool:
+    def __init__(self, pipeline: AsyncResearchPipeline, queue: JobQueue,
+                 concurrency: int = 4, poll_interval: float = 1.0,
+                 partial_interval: float = 5.0):
+        """
+        Initialize worker pool
+
+        Args:
+            pipeline: Async research pipeline used to run jobs
+            queue: Durable job queue
+            concurrency: Jobs run at the same time by this process
+            poll_interval: Seconds to wait when the queue is empty
+            partial_interval: Seconds between saves of a running job's
+                              report text
+        """
+        self.pipeline = pipeline
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.partial_interval = partial_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task):
+        """
+        Renew the lease while the job runs
+
+        Once the lease is lost (taken over after expiring, or not
+        renewable for a whole lease period) the run is cancelled, so the
+        job is not run by two workers at once.
+        """
+        renewed = time.monotonic()
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id):
+                    renewed = time.monotonic()
+                    continue
+                print(f"Job {job_id} lost its lease")
+            except Exception as e:
+                print(f"Error renewing lease of job {job_id}: {e}")
+                if time.monotonic() - renewed < self.queue.lease_seconds:
+                    continue
+            run.cancel()
+            return
+
+    async def _save_partial(self, job_id: str, saved: str = "") -> str:
+        """Store the job's streamed report text if it changed; returns it"""
+        text = progress_broker.report_text(job_id)
+        if text and text != saved:
+            try:
+                await asyncio.to_thread(self.queue.save_partial, job_id, self.worker_id, text)
+            except Exception as e:
+                print(f"Error saving partial report of job {job_id}: {e}")
+                return saved
+        return text
+
+    async def _save_partials(self, job_id: str):
+        """Save the report text periodically while the job runs"""
+        saved = ""
+        while True:
+            await asyncio.sleep(self.partial_interval)
+            saved = await self._save_partial(job_id, saved)
+
+    async def _run_job(self, job: Dict):
+        print(f"Job {job['id']} started (attempt {job['attempts']})")
+        run_key = research_key(job['query'], job['filters'])
+        progress_broker.attach(job['id'], fetch_key(job['query']))
+        progress_broker.attach(job['id'], run_key)
+        progress_broker.emit(job['id'], 'started', {'attempt': job['attempts']})
+        run = asyncio.create_task(process_research_job(self.pipeline, job))
+        heartbeat = asyncio.create_task(self._heartbeat(job['id'], run))
+        partials = asyncio.create_task(self._save_partials(job['id']))
+        try:
+            result, timings = await run
+            await asyncio.to_thread(
+                self.queue.complete, job['id'], self.worker_id, result, timings
+            )
+            progress_broker.emit(job['id'], 'done', dict(result, timings=timings))
+            print(f"Job {job['id']} done")
+        except asyncio.CancelledError:
+            partials.cancel()
+            # Keep the text of an interrupted attempt; a lost lease makes this a no-op
+            await self._save_partial(job['id'])
+            if not heartbeat.done():
+                raise
+            # Cancelled by the heartbeat; the job belongs to whoever holds the lease now
+            print(f"Job {job['id']} abandoned")
+            progress_broker.emit(job['id'], 'retrying', {'error': 'lease lost'})
+        except Exception as e:
+            retry = e.retry if isinstance(e, JobError) else True
+            print(f"Job {job['id']} failed: {e}")
+            partials.cancel()
+            await self._save_partial(job['id'])
+            await asyncio.to_thread(self.queue.fail, job['id'], self.worker_id, str(e), retry)
+            progress_broker.emit(job['id'], 'retrying' if retry else 'failed', {'error': str(e)})
+        finally:
+            heartbeat.cancel()
+            partials.cancel()
+            run.cancel()
+            progress_broker.detach(job['id'], fetch_key(job['query']))
+            progress_broker.detach(job['id'], run_key)
+
+    async def _housekeeping(self):
+        """Drop finished jobs past the retention period, hourly"""
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.queue.purge)
+                if purged:
+                    print(f"Purged {purged} finished jobs")
+            except Exception as e:
+                print(f"Error purging jobs: {e}")
+            await asyncio.sleep(3600)
+
+    async def _worker_loop(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id)
+            except Exception as e:
+                print(f"Error leasing job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._run_job(job)
+
+    def start(self):
+        """Start worker coroutines on the running event loop"""
+        print(f"Starting {self.concurrency} job workers ({self.worker_id})")
+        self._tasks = [
+            asyncio.create_task(self._worker_loop())
+            for _ in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+
+    async def wait(self):
+        """Run until the workers are cancelled"""
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self):
+        """
+        Stop workers
+
+        Interrupted jobs keep their lease and are retried by another
+        worker once it expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def main():
+    """Standalone worker process"""
+    engine = ResearchEngine()
+    pipeline = AsyncResearchPipeline(engine)
+    pool = WorkerPool(
+        pipeline,
+        job_queue,
+        concurrency=int(os.getenv("JOB_WORKERS", "4")),
+        partial_interval=float(os.getenv("JOB_PARTIAL_INTERVAL", "5"))
+    )
+    pool.start()
+    try:
+        await pool.wait()
+    finally:
+        await pool.stop()
+        await pipeline.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark arXiv feed parsing
+Compares the original str.split parser (whole body, four fields per
+entry) with the streaming XMLPullParser path (64 KiB chunks, every
+field) on synthetic feeds of 20, 500 and 2000 entries: median parse
+time and peak memory allocated while parsing:
+
+    python -m benchmarks.arxiv_parser --runs 20
+"""
+import time
+import argparse
+import statistics
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app.arxiv_parser import parse_arxiv_feed
+
+SIZES = (20, 500, 2000)
+CHUNK_SIZE = 65536
+
+ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/2401.{number:05d}v1</id>
+    <updated>2024-01-{day:02d}T18:00:00Z</updated>
+    <published>2024-01-{day:02d}T18:00:00Z</published>
+    <title>Synthetic paper {number} on retrieval augmented
+      generation for scientific literature</title>
+    <summary>  {summary}
+    </summary>
+    <author>
+      <name>Ada Lovelace</name>
+    </author>
+    <author>
+      <name>Alan Turing</name>
+    </author>
+    <arxiv:comment xmlns:arxiv="http://arxiv.org/schemas/atom">12 pages, 4 figures</arxiv:comment>
+    <link href="http://arxiv.org/abs/2401.{number:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{number:05d}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.IR" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+"""
+SUMMARY = (
+    "We study how retrieval quality affects generated answers. Our method "
+    "reranks passages with a lightweight cross-encoder and improves exact "
+    "match by 4.2 points on three benchmarks while reducing latency by 30%. "
+) * 4
+
+
+def synthetic_feed(entries: int) -> bytes:
+    """Atom feed shaped like an arXiv API response"""
+    body = "".join(
+        ENTRY.format(number=i, day=i % 28 + 1, summary=SUMMARY.strip())
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        '  <title type="html">ArXiv Query: search_query=all:rag</title>\n'
+        '  <id>http://arxiv.org/api/synthetic</id>\n'
+        '  <updated>2024-01-31T00:00:00-05:00</updated>\n'
+        f'  <opensearch:totalResults xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">{entries}'
+        '</opensearch:totalResults>\n'
+        f'{body}</feed>\n'
+    ).encode()
+
+
+def legacy_parse(body: bytes) -> List[Dict]:
+    """The original parser: split the decoded body on tag strings"""
+    papers = []
+    entries = body.decode().split('<entry>')
+    for entry in entries[1:]:
+        try:
+            title = entry.split('<title>')[1].split('</title>')[0].strip()
+            title = ' '.join(title.split())
+            summary = entry.split('<summary>')[1].split('</summary>')[0].strip()
+            summary = ' '.join(summary.split())[:800]
+            link = entry.split('<id>')[1].split('</id>')[0].strip()
+            published = entry.split('<published>')[1].split('</published>')[0].strip()
+            papers.append({
+                'title': title,
+                'content': summary,
+                'url': link,
+                'source': 'arXiv',
+                'published_date': published.split('T')[0]
+            })
+        except IndexError:
+            continue
+    return papers
+
+
+def streaming_parse(body: bytes) -> List[Dict]:
+    """The current parser, fed the body in response-sized chunks"""
+    chunks = (body[start:start + CHUNK_SIZE] for start in range(0, len(body), CHUNK_SIZE))
+    return list(parse_arxiv_feed(chunks))
+
+
+def measure(parse: Callable[[bytes], List[Dict]], body: bytes, runs: int) -> Dict:
+    """Median wall time over runs, then peak traced memory of one run"""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        papers = parse(body)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'papers': len(papers),
+        'ms': round(statistics.median(times) * 1000, 2),
+        'peak_kib': round(peak / 1024)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per parser and size")
+    args = parser.parse_args()
+
+    print(f"{'entries':>7}{'feed KiB':>10}{'legacy ms':>11}{'stream ms':>11}"
+          f"{'legacy peak KiB':>17}{'stream peak KiB':>17}")
+    for size in SIZES:
+        body = synthetic_feed(size)
+        legacy = measure(legacy_parse, body, args.runs)
+        streaming = measure(streaming_parse, body, args.runs)
+        assert legacy['papers'] == streaming['papers'] == size
+        print(f"{size:>7}{len(body) // 1024:>10}{legacy['ms']:>11}{streaming['ms']:>11}"
+              f"{legacy['peak_kib']:>17}{streaming['peak_kib']:>17}")
+
+
+if __name__ == "__main__":
+    main()
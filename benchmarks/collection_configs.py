@@ -0,0 +1,142 @@
+"""
+Benchmark research_docs collection configurations
+For each configuration: estimated RAM per million papers, p50/p99
+search latency and recall@10 against exact search. Needs a running
+Qdrant server (quantization is not available in local mode):
+
+    python -m benchmarks.collection_configs --url http://localhost:6333 --points 200000
+
+Vectors are synthetic and clustered by default; pass --embeddings with
+the embedding cache database to benchmark real abstract embeddings.
+"""
+import time
+import sqlite3
+import argparse
+from typing import Dict, List
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, OptimizersConfigDiff, SearchParams, CollectionStatus
+
+from app.collection_config import CollectionConfig, VECTOR_SIZE
+
+CONFIGS = {
+    'float32': CollectionConfig(),
+    'scalar': CollectionConfig(quantization="scalar"),
+    'scalar-on-disk': CollectionConfig(quantization="scalar", on_disk=True),
+    'binary-on-disk': CollectionConfig(quantization="binary", on_disk=True, oversampling=3.0),
+    'scalar-m32': CollectionConfig(quantization="scalar", hnsw_m=32, hnsw_ef_construct=200)
+}
+
+# Bytes per stored vector for each quantization mode
+QUANTIZED_BYTES = {'none': 0, 'scalar': VECTOR_SIZE, 'binary': VECTOR_SIZE // 8}
+
+
+def estimate_ram_mb_per_million(config: CollectionConfig) -> float:
+    """
+    Resident memory per million points: original vectors unless on disk,
+    quantized vectors, and the level-0 HNSW graph (2 * m links of 4 bytes)
+    """
+    per_point = 0 if config.on_disk else VECTOR_SIZE * 4
+    per_point += QUANTIZED_BYTES[config.quantization]
+    per_point += config.hnsw_m * 2 * 4
+    return round(per_point * 1_000_000 / 1024 ** 2, 1)
+
+
+def synthetic_vectors(count: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors around a few hundred topic centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(256, VECTOR_SIZE))
+    vectors = centroids[rng.integers(0, len(centroids), count)] + rng.normal(scale=0.6, size=(count, VECTOR_SIZE))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def cached_vectors(db_path: str, count: int) -> np.ndarray:
+    """Real embeddings from the embedding cache database"""
+    db = sqlite3.connect(db_path)
+    rows = db.execute("SELECT vector FROM embeddings LIMIT ?", (count,)).fetchall()
+    return np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+
+
+def load(client: QdrantClient, name: str, config: CollectionConfig, vectors: np.ndarray):
+    """Create a collection, upload vectors and wait until it is indexed"""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    config.create(client, name)
+    # Index small benchmark collections too
+    client.update_collection(name, optimizers_config=OptimizersConfigDiff(indexing_threshold=1000))
+
+    for start in range(0, len(vectors), 1000):
+        client.upsert(name, points=[
+            PointStruct(id=start + offset, vector=vector.tolist())
+            for offset, vector in enumerate(vectors[start:start + 1000])
+        ], wait=False)
+
+    while True:
+        info = client.get_collection(name)
+        if info.status == CollectionStatus.GREEN and (info.indexed_vectors_count or 0) >= len(vectors) * 0.99:
+            return
+        time.sleep(1)
+
+
+def search_ids(client: QdrantClient, name: str, query: np.ndarray, params) -> List[int]:
+    return [
+        point.id for point in
+        client.query_points(name, query=query.tolist(), limit=10, search_params=params).points
+    ]
+
+
+def benchmark(client: QdrantClient, label: str, config: CollectionConfig,
+              vectors: np.ndarray, queries: np.ndarray) -> Dict:
+    """Latency and recall@10 of one configuration"""
+    name = f"bench_{label.replace('-', '_')}"
+    load(client, name, config, vectors)
+
+    latencies = []
+    recalls = []
+    for query in queries:
+        exact = set(search_ids(client, name, query, SearchParams(exact=True)))
+        started = time.perf_counter()
+        found = search_ids(client, name, query, config.search_params())
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(exact.intersection(found)) / max(len(exact), 1))
+
+    client.delete_collection(name)
+    return {
+        'config': label,
+        'ram_mb_per_million': estimate_ram_mb_per_million(config),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'recall_at_10': round(float(np.mean(recalls)), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--api-key")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--embeddings", help="Embedding cache SQLite file to take vectors from")
+    parser.add_argument("--configs", nargs="*", choices=list(CONFIGS), default=list(CONFIGS))
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, api_key=args.api_key, timeout=120)
+    if args.embeddings:
+        vectors = cached_vectors(args.embeddings, args.points + args.queries)
+    else:
+        vectors = synthetic_vectors(args.points + args.queries)
+    # Held-out vectors serve as queries
+    vectors, queries = vectors[:-args.queries], vectors[-args.queries:]
+    print(f"{len(vectors)} points, {len(queries)} queries")
+
+    print(f"{'config':<16}{'RAM MB/1M':>12}{'p50 ms':>10}{'p99 ms':>10}{'recall@10':>12}")
+    for label in args.configs:
+        row = benchmark(client, label, CONFIGS[label], vectors, queries)
+        print(f"{row['config']:<16}{row['ram_mb_per_million']:>12}{row['p50_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['recall_at_10']:>12}")
+
+
+if __name__ == "__main__":
+    main()
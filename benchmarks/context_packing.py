@@ -0,0 +1,86 @@
+"""
+Benchmark report prompt size with and without context packing
+For each query, fetches arXiv abstracts and compares the prompt built
+from the top papers' abstracts cut at 800 characters (the previous
+behavior) with the token-budget-packed prompt and the prompt built from
+extractive paper digests: prompt tokens and the number of papers
+available to cite.
+
+    python -m benchmarks.context_packing --budget 1000
+"""
+import asyncio
+import argparse
+from typing import Dict, List
+
+from app.arxiv_parser import parse_arxiv_feed
+from app.context_packer import ContextPacker
+from app.paper_digests import extractive_digest, digest_content
+from app.http_client import AsyncOutboundHTTP
+from app.rate_limiter import arxiv_limiter
+from app.research_engine import ResearchEngine, REPORT_PROMPT_DOCS
+
+QUERIES = [
+    "retrieval augmented generation",
+    "diffusion models for protein design",
+    "quantization of large language models",
+    "graph neural networks for traffic forecasting",
+    "federated learning privacy attacks"
+]
+LEGACY_SUMMARY_CHARS = 800
+
+
+async def fetch(http: AsyncOutboundHTTP, query: str, limit: int) -> List[Dict]:
+    # Spaced like the pipeline's arXiv requests (ARXIV_MIN_INTERVAL)
+    response = await http.request(
+        "GET",
+        "http://export.arxiv.org/api/query",
+        params={'search_query': f"all:{query}", 'max_results': limit, 'sortBy': 'relevance'},
+        limiter=arxiv_limiter
+    )
+    response.raise_for_status()
+    return list(parse_arxiv_feed([response.content]))
+
+
+async def fetch_all(queries: List[str], limit: int) -> List[List[Dict]]:
+    http = AsyncOutboundHTTP()
+    try:
+        return [await fetch(http, query, limit) for query in queries]
+    finally:
+        await http.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=1200, help="Context token budget")
+    parser.add_argument("--tokenizer", default=None, help="Hugging Face tokenizer used for counting")
+    parser.add_argument("--papers", type=int, default=10, help="Papers fetched per query")
+    parser.add_argument("--digest-tokens", type=int, default=80, help="Digest length limit")
+    args = parser.parse_args()
+
+    packer = ContextPacker(token_budget=args.budget, max_docs=REPORT_PROMPT_DOCS, tokenizer_name=args.tokenizer)
+    # Only the prompt template is needed
+    engine = ResearchEngine.__new__(ResearchEngine)
+
+    print(f"{'query':<48} {'legacy':>7} {'packed':>7} {'digest':>7}  papers")
+    totals = [0, 0, 0]
+    for query, papers in zip(QUERIES, asyncio.run(fetch_all(QUERIES, args.papers))):
+        legacy = [dict(paper, content=paper['content'][:LEGACY_SUMMARY_CHARS]) for paper in papers[:REPORT_PROMPT_DOCS]]
+        packed = packer.pack(query, papers)
+        digested = packer.pack(query, [
+            dict(paper, content=digest_content(*extractive_digest(paper, packer.count_tokens, args.digest_tokens)))
+            for paper in papers[:REPORT_PROMPT_DOCS]
+        ])
+
+        tokens = [
+            packer.count_tokens(engine._build_report_prompt(query, documents))
+            for documents in (legacy, packed, digested)
+        ]
+        totals = [total + count for total, count in zip(totals, tokens)]
+        print(f"{query[:48]:<48} {tokens[0]:>7} {tokens[1]:>7} {tokens[2]:>7}  "
+              f"{len(legacy)}/{len(packed)}/{len(digested)}")
+
+    print(f"{'total':<48} {totals[0]:>7} {totals[1]:>7} {totals[2]:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark the durable job queue
+Reports enqueue and lease+complete throughput (jobs/s) with several
+worker threads sharing one database file, on an empty history and with
+a backlog of finished jobs that the partial indexes should skip:
+
+    python -m benchmarks.job_queue --jobs 5000 --workers 1 4 8 --history 100000
+"""
+import os
+import time
+import argparse
+import tempfile
+import threading
+from typing import Dict
+
+from app.job_queue import JobQueue, DONE
+
+PRIORITIES = (0, 0, 0, 1, 2)
+
+
+def add_history(queue: JobQueue, count: int):
+    """Finished jobs, as left behind by earlier runs within the retention period"""
+    now = time.time()
+    queue._connect().executemany(
+        "INSERT INTO jobs (id, query, email, priority, status, attempts, available_at, "
+        "created_at, finished_at) VALUES (?, 'history', 'bench@example.com', 0, ?, 1, ?, ?, ?)",
+        [(f"history-{i}", DONE, now, now, now) for i in range(count)]
+    )
+
+
+def run(db_path: str, jobs: int, workers: int, history: int) -> Dict:
+    """Enqueue from one thread, then drain the queue with worker threads"""
+    queue = JobQueue(db_path)
+    if history:
+        add_history(queue, history)
+
+    started = time.perf_counter()
+    for i in range(jobs):
+        queue.enqueue(f"benchmark query {i}", "bench@example.com", None, PRIORITIES[i % len(PRIORITIES)])
+    enqueue_seconds = time.perf_counter() - started
+
+    drained = []
+
+    def worker(worker_id: str):
+        count = 0
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                break
+            queue.complete(job['id'], worker_id, {'report': 'ok'}, {'total': 0.0})
+            count += 1
+        drained.append(count)
+
+    threads = [threading.Thread(target=worker, args=(f"bench-{i}",)) for i in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    drain_seconds = time.perf_counter() - started
+
+    return {
+        'enqueue_per_sec': round(jobs / enqueue_seconds, 1),
+        'drain_per_sec': round(sum(drained) / drain_seconds, 1),
+        'drained': sum(drained)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000, help="Jobs enqueued and drained per run")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Worker thread counts")
+    parser.add_argument("--history", type=int, default=100000, help="Finished jobs already in the table")
+    args = parser.parse_args()
+
+    print(f"{'history':>8}{'workers':>9}{'enqueue jobs/s':>16}{'lease+complete jobs/s':>23}")
+    for history in sorted({0, args.history}):
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as directory:
+                result = run(os.path.join(directory, "jobs.sqlite"), args.jobs, workers, history)
+            assert result['drained'] == args.jobs, result
+            print(f"{history:>8}{workers:>9}{result['enqueue_per_sec']:>16}{result['drain_per_sec']:>23}")
+
+
+if __name__ == "__main__":
+    main()
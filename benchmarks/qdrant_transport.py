@@ -0,0 +1,89 @@
+"""
+Benchmark REST against gRPC for Qdrant upserts and searches
+Reports points/s for upserts and queries/s for batched searches at
+batch sizes from 1 to 1000. Needs a running Qdrant server with both
+ports open (the client's local mode has no transport to compare):
+
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python -m benchmarks.qdrant_transport --host localhost --points 20000
+"""
+import time
+import argparse
+from typing import Dict
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, QueryRequest
+
+from app.collection_config import CollectionConfig
+from benchmarks.collection_configs import synthetic_vectors
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def run(client: QdrantClient, name: str, vectors: np.ndarray, queries: np.ndarray,
+        batch_size: int) -> Dict:
+    """Upsert and search throughput at one batch size"""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    CollectionConfig().create(client, name)
+
+    payload = {'title': 'benchmark', 'source': 'arXiv', 'published_ts': 0.0}
+    started = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        client.upsert(name, points=[
+            PointStruct(id=start + offset, vector=vector.tolist(), payload=payload)
+            for offset, vector in enumerate(vectors[start:start + batch_size])
+        ])
+    upsert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch_size):
+        client.query_batch_points(name, requests=[
+            QueryRequest(query=query.tolist(), limit=10, with_payload=True)
+            for query in queries[start:start + batch_size]
+        ])
+    search_seconds = time.perf_counter() - started
+
+    client.delete_collection(name)
+    return {
+        'upsert_points_per_sec': round(len(vectors) / upsert_seconds, 1),
+        'search_queries_per_sec': round(len(queries) / search_seconds, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--api-key")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.points + args.queries)
+    vectors, queries = vectors[:-args.queries], vectors[-args.queries:]
+
+    print(f"{'transport':<10}{'batch':>7}{'upsert pts/s':>15}{'search q/s':>13}")
+    for transport in ("rest", "grpc"):
+        client = QdrantClient(
+            host=args.host,
+            port=args.port,
+            grpc_port=args.grpc_port,
+            api_key=args.api_key,
+            https=False,
+            prefer_grpc=transport == "grpc",
+            timeout=120
+        )
+        for batch_size in BATCH_SIZES:
+            # Tiny batches take long; keep their runs short
+            limit = min(len(vectors), batch_size * 2000)
+            row = run(client, f"bench_{transport}", vectors[:limit], queries, batch_size)
+            print(f"{transport:<10}{batch_size:>7}{row['upsert_points_per_sec']:>15}"
+                  f"{row['search_queries_per_sec']:>13}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+arXiv requests stay spaced by the shared rate limiter
+A local fake arXiv server records when each request arrives; pages
+fetched concurrently and retried attempts must all be at least one
+limiter interval apart
+"""
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("qdrant_client")
+pytest.importorskip("fastembed")
+
+import app.async_pipeline as async_pipeline
+from app.async_pipeline import AsyncResearchPipeline
+from app.arxiv_cache import ArxivCache
+from app.http_client import AsyncOutboundHTTP
+from app.rate_limiter import TokenBucket
+from app.research_engine import ResearchEngine
+
+INTERVAL = 0.2
+# Slack for scheduling jitter between the client and the server thread
+TOLERANCE = 0.03
+
+
+def atom_feed(start: int, size: int, total: int, available: int) -> bytes:
+    entries = "".join(
+        f"<entry><id>http://arxiv.org/abs/2401.{number:05d}v1</id>"
+        f"<published>2024-01-01T00:00:00Z</published>"
+        f"<title>Paper {number}</title><summary>Abstract of paper {number}.</summary></entry>"
+        for number in range(start, min(start + size, available))
+    )
+    return (
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>{entries}</feed>"
+    ).encode()
+
+
+class FakeArxiv:
+    def __init__(self, total: int, failures: int = 0, available: int = None):
+        """
+        Args:
+            total: Results the search reports
+            failures: Requests answered with 503 before serving feeds
+            available: Results actually served, when fewer than reported
+        """
+        self.total = total
+        self.available = total if available is None else available
+        self.failures = failures
+        self.arrivals = []
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.arrivals.append(time.monotonic())
+                    fail = len(fake.arrivals) <= fake.failures
+                if fail:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                params = parse_qs(urlsplit(self.path).query)
+                body = atom_feed(
+                    int(params['start'][0]), int(params['max_results'][0]), fake.total, fake.available
+                )
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/atom+xml')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/query"
+
+    def gaps(self):
+        return [later - earlier for earlier, later in zip(self.arrivals, self.arrivals[1:])]
+
+
+@pytest.fixture
+def fake_arxiv():
+    servers = []
+
+    def start(**kwargs) -> FakeArxiv:
+        servers.append(FakeArxiv(**kwargs))
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.server.shutdown()
+
+
+@pytest.fixture
+def pipeline_for(tmp_path, monkeypatch):
+    """Pipeline with only the arXiv settings, a private cache and a fast limiter"""
+    monkeypatch.setattr(async_pipeline, "arxiv_cache", ArxivCache(str(tmp_path / "arxiv"), ttl=3600))
+    monkeypatch.setattr(async_pipeline, "arxiv_limiter", TokenBucket(rate=1.0 / INTERVAL))
+
+    def build(url: str, max_results: int, page_size: int) -> AsyncResearchPipeline:
+        engine = ResearchEngine.__new__(ResearchEngine)
+        engine.arxiv_url = url
+        engine.arxiv_max_results = max_results
+        engine.arxiv_page_size = page_size
+        engine.arxiv_page_lookahead = 2
+        pipeline = AsyncResearchPipeline.__new__(AsyncResearchPipeline)
+        pipeline.engine = engine
+        pipeline.http = AsyncOutboundHTTP()
+        return pipeline
+    return build
+
+
+def test_concurrent_pages_are_spaced(fake_arxiv, pipeline_for):
+    fake = fake_arxiv(total=50)
+    pipeline = pipeline_for(fake.url, max_results=40, page_size=10)
+
+    async def fetch():
+        try:
+            return [page async for page in pipeline.iter_arxiv_pages("retrieval", 40)]
+        finally:
+            await pipeline.http.aclose()
+
+    pages = asyncio.run(fetch())
+
+    assert [len(page) for page in pages] == [10, 10, 10, 10]
+    assert len(fake.arrivals) == 4
+    assert min(fake.gaps()) >= INTERVAL - TOLERANCE
+
+
+def test_retries_wait_for_the_limiter(fake_arxiv, pipeline_for):
+    fake = fake_arxiv(total=5, failures=2)
+    pipeline = pipeline_for(fake.url, max_results=5, page_size=5)
+
+    async def fetch():
+        try:
+            return await pipeline._fetch_arxiv_page("retrieval", 0, 5)
+        finally:
+            await pipeline.http.aclose()
+
+    papers = asyncio.run(fetch())
+
+    assert len(papers) == 5
+    # Two 503s with Retry-After: 0, then the feed
+    assert len(fake.arrivals) == 3
+    assert min(fake.gaps()) >= INTERVAL - TOLERANCE
+
+
+def test_early_end_leaves_the_limiter_free(fake_arxiv, pipeline_for):
+    # arXiv reports more results than it serves: the third page is empty
+    fake = fake_arxiv(total=200, available=20)
+    pipeline = pipeline_for(fake.url, max_results=200, page_size=10)
+
+    async def fetch():
+        try:
+            pages = [page async for page in pipeline.iter_arxiv_pages("retrieval", 200)]
+        finally:
+            await pipeline.http.aclose()
+        # The next job is not held up by pages that were never requested
+        started = time.monotonic()
+        await async_pipeline.arxiv_limiter.acquire_async()
+        return pages, time.monotonic() - started
+
+    pages, wait = asyncio.run(fetch())
+
+    assert [len(page) for page in pages] == [10, 10, 0]
+    assert len(fake.arrivals) <= 5
+    assert wait <= INTERVAL + TOLERANCE
+
+
+def test_cached_pages_skip_the_limiter(fake_arxiv, pipeline_for):
+    fake = fake_arxiv(total=5)
+    pipeline = pipeline_for(fake.url, max_results=5, page_size=5)
+
+    async def fetch():
+        try:
+            first = await pipeline._fetch_arxiv_page("retrieval", 0, 5)
+            meta = {}
+            started = time.monotonic()
+            second = await pipeline._fetch_arxiv_page("retrieval", 0, 5, meta)
+            return first, second, meta, time.monotonic() - started
+        finally:
+            await pipeline.http.aclose()
+
+    first, second, meta, elapsed = asyncio.run(fetch())
+
+    assert second == first
+    assert meta['total_results'] == 5
+    assert len(fake.arrivals) == 1
+    assert elapsed < INTERVAL
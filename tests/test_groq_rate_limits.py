@@ -0,0 +1,177 @@
+"""
+Report generations stay within Groq's rate limits
+A local fake OpenAI-compatible server enforces request and token limits
+per window, reports them in x-ratelimit-* headers and answers 429 when a
+call does not fit. Concurrent generations paced by the Groq scheduler
+must all complete with at most a few 429s
+"""
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("qdrant_client")
+pytest.importorskip("fastembed")
+
+import app.async_pipeline as async_pipeline
+import app.http_client as http_client
+from app.async_pipeline import AsyncResearchPipeline
+from app.context_packer import ContextPacker
+from app.http_client import AsyncOutboundHTTP
+from app.llm_scheduler import GroqScheduler, estimate_tokens
+from app.report_cache import ReportCache
+from app.research_engine import ResearchEngine
+
+JOBS = 12
+CONCURRENCY = 8
+REQUESTS_PER_WINDOW = 4
+TOKENS_PER_WINDOW = 30000
+WINDOW = 1.0
+# 429s tolerated, e.g. around a window reset
+MAX_REJECTED = 2
+
+DOCUMENTS = [{
+    'title': 'Paper', 'content': 'Abstract ' * 100, 'url': 'http://arxiv.org/abs/2401.00001v1',
+    'published_date': '2024-01-01', 'arxiv_id': '2401.00001v1'
+}]
+
+
+class FakeGroq:
+    def __init__(self, requests_per_window: int, tokens_per_window: int, window: float):
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.rejected = 0
+        self.served = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._requests = 0
+        self._tokens = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = body['messages'][0]['content']
+                admitted, headers = fake.admit(estimate_tokens(prompt, body['max_tokens']))
+                if admitted:
+                    payload = json.dumps({
+                        'choices': [{'message': {'content': 'Fake report [1].'}}],
+                        'usage': {'completion_tokens': 4}
+                    }).encode()
+                    self.send_response(200)
+                else:
+                    payload = json.dumps({'error': {'message': 'Rate limit reached'}}).encode()
+                    self.send_response(429)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/chat/completions"
+
+    def admit(self, cost: int):
+        """Returns (admitted, rate-limit headers)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._requests, self._tokens = now, 0, 0
+            admitted = (self._requests < self.requests_per_window
+                        and self._tokens + cost <= self.tokens_per_window)
+            if admitted:
+                self._requests += 1
+                self._tokens += cost
+                self.served += 1
+            else:
+                self.rejected += 1
+            reset = f"{self._window_start + self.window - now:.3f}s"
+            headers = {
+                'x-ratelimit-limit-requests': str(self.requests_per_window),
+                'x-ratelimit-remaining-requests': str(self.requests_per_window - self._requests),
+                'x-ratelimit-reset-requests': reset,
+                'x-ratelimit-limit-tokens': str(self.tokens_per_window),
+                'x-ratelimit-remaining-tokens': str(self.tokens_per_window - self._tokens),
+                'x-ratelimit-reset-tokens': reset
+            }
+            if not admitted:
+                headers['retry-after'] = reset.rstrip('s')
+            return admitted, headers
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    fake = FakeGroq(REQUESTS_PER_WINDOW, TOKENS_PER_WINDOW, WINDOW)
+    # 429s go back to the scheduler, as they do for api.groq.com
+    monkeypatch.setitem(http_client.HOST_POLICIES, "127.0.0.1", http_client.HOST_POLICIES['api.groq.com'])
+    yield fake
+    fake.server.shutdown()
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    """Private report cache and scheduler, so runs neither share state nor touch DATA_DIR"""
+    monkeypatch.setattr(async_pipeline, "report_cache", ReportCache(str(tmp_path / "reports.sqlite")))
+    scheduler = GroqScheduler(poll_interval=0.05)
+    monkeypatch.setattr(async_pipeline, "groq_scheduler", scheduler)
+    return scheduler
+
+
+def offline_pipeline(url: str) -> AsyncResearchPipeline:
+    """Pipeline with only the Groq settings, skipping Qdrant and the model"""
+    engine = ResearchEngine.__new__(ResearchEngine)
+    engine.groq_api_key = "fake"
+    engine.groq_url = url
+    engine.groq_model = "fake-model"
+    engine.groq_stream = False
+    engine.groq_timeout = 30
+    engine.groq_rate_limit_retries = 5
+    engine.context_packer = ContextPacker()
+    engine.report_mode = "single"
+    engine.report_context = "abstract"
+
+    pipeline = AsyncResearchPipeline.__new__(AsyncResearchPipeline)
+    pipeline.engine = engine
+    pipeline.http = AsyncOutboundHTTP()
+    return pipeline
+
+
+def test_concurrent_reports_stay_within_limits(fake_groq, scheduler):
+    pipeline = offline_pipeline(fake_groq.url)
+
+    async def run():
+        slots = asyncio.Semaphore(CONCURRENCY)
+
+        async def job(index: int):
+            async with slots:
+                # Distinct queries so no report is served from the cache
+                return await pipeline._generate_report(
+                    f"rate limit run {index}", DOCUMENTS, priority=index % 3
+                )
+
+        try:
+            return await asyncio.gather(*(job(index) for index in range(JOBS)))
+        finally:
+            await pipeline.http.aclose()
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+
+    assert [report for report, _ in results] == ["Fake report [1]."] * JOBS
+    assert all(generation['complete'] and not generation['failed'] for _, generation in results)
+    assert fake_groq.served == JOBS
+    assert fake_groq.rejected <= MAX_REJECTED
+    assert scheduler.stats()['admitted'] == JOBS + fake_groq.rejected
+    # Paced by the request limit rather than pushed through on retries
+    assert elapsed >= (JOBS / REQUESTS_PER_WINDOW - 1) * WINDOW
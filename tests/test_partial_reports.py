@@ -0,0 +1,96 @@
+"""
+Report text streamed before an attempt ends is kept on the job record
+Workers save it periodically and when the attempt fails or is cancelled,
+so GET /api/research/{id} can return it while the job waits to retry
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("qdrant_client")
+pytest.importorskip("fastembed")
+
+import app.worker as worker
+from app.job_queue import JobQueue, QUEUED
+from app.progress import ProgressBroker
+from app.query_utils import research_key
+from app.single_flight import AsyncSingleFlight
+
+QUERY = "retrieval augmented generation"
+REPORT_PARTS = ["Recent work ", "reranks passages "]
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = ProgressBroker()
+    monkeypatch.setattr(worker, "progress_broker", broker)
+    monkeypatch.setattr(worker, "async_research_flight", AsyncSingleFlight())
+    return broker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"), retry_delay=60)
+
+
+def streaming_pipeline(broker: ProgressBroker, finish):
+    """Pipeline that streams the report parts, then calls finish()"""
+
+    async def run_full_research(query, filters=None, priority=0):
+        for part in REPORT_PARTS:
+            broker.publish(research_key(query, filters), 'report_delta', {'text': part})
+            await asyncio.sleep(0.05)
+        return await finish()
+
+    return SimpleNamespace(run_full_research=run_full_research)
+
+
+def test_failed_attempt_keeps_its_text(broker, queue):
+    async def crash():
+        raise RuntimeError("connection reset")
+
+    pool = worker.WorkerPool(streaming_pipeline(broker, crash), queue)
+    job_id = queue.enqueue(QUERY, "reader@example.com")
+    asyncio.run(pool._run_job(queue.lease(pool.worker_id)))
+
+    job = queue.get(job_id)
+    assert job['status'] == QUEUED
+    assert job['partial'] == "".join(REPORT_PARTS)
+
+
+def test_running_job_saves_its_text_periodically(broker, queue):
+    async def hang():
+        await asyncio.sleep(10)
+
+    pool = worker.WorkerPool(streaming_pipeline(broker, hang), queue, partial_interval=0.05)
+    job_id = queue.enqueue(QUERY, "reader@example.com")
+
+    async def run():
+        task = asyncio.create_task(pool._run_job(queue.lease(pool.worker_id)))
+        await asyncio.sleep(0.3)
+        saved = queue.get(job_id)['partial']
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # A later attempt starts its text afresh
+        broker.emit(job_id, 'started', {'attempt': 2})
+        return saved, broker.report_text(job_id)
+
+    assert asyncio.run(run()) == ("".join(REPORT_PARTS), "")
+
+
+def test_unfinished_job_history_expires():
+    broker = ProgressBroker(history_ttl=0.1, idle_ttl=0.1)
+
+    async def run():
+        broker.emit("job", 'started', {'attempt': 1})
+        await asyncio.sleep(0.05)
+        # Each event pushes the expiry back
+        broker.emit("job", 'retrying', {'error': 'lease lost'})
+        await asyncio.sleep(0.07)
+        kept = "job" in broker._history
+        await asyncio.sleep(0.1)
+        return kept, "job" in broker._history, broker._expiry
+
+    assert asyncio.run(run()) == (True, False, {})
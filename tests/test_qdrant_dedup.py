@@ -0,0 +1,85 @@
+"""
+Concurrent jobs storing overlapping papers create one point per paper
+Point IDs come from the version-stripped arXiv ID, so parallel upserts
+of the same paper (or of another version of it) land on one point
+"""
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("httpx")
+pytest.importorskip("fastembed")
+qdrant_client = pytest.importorskip("qdrant_client")
+
+from app.async_pipeline import AsyncResearchPipeline, ThreadedQdrant
+from app.arxiv_parser import canonical_arxiv_id
+from app.collection_config import CollectionConfig, VECTOR_SIZE
+from app.research_engine import ResearchEngine, LockedQdrant
+
+
+class FakeEncoder:
+    """Deterministic unit vectors derived from the text"""
+
+    def embed(self, texts, usage=None):
+        vectors = []
+        for text in texts:
+            vector = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(VECTOR_SIZE)
+            vectors.append((vector / np.linalg.norm(vector)).astype(np.float32))
+        return vectors
+
+    async def embed_async(self, texts, usage=None, executor=None):
+        return self.embed(texts, usage)
+
+
+def paper(number: int, version: int = 1) -> dict:
+    arxiv_id = f"2401.{number:05d}v{version}"
+    return {
+        'title': f"Paper {number}",
+        'content': f"Abstract of paper {number}, version {version}.",
+        'url': f"http://arxiv.org/abs/{arxiv_id}",
+        'source': 'arXiv',
+        'published_date': '2024-01-15',
+        'arxiv_id': arxiv_id,
+        'categories': ['cs.CL']
+    }
+
+
+@pytest.fixture
+def pipeline():
+    client = qdrant_client.QdrantClient(":memory:")
+    CollectionConfig().create(client, "research_docs")
+
+    engine = ResearchEngine.__new__(ResearchEngine)
+    engine.encoder = FakeEncoder()
+    engine.qdrant = LockedQdrant(client)
+
+    pipeline = AsyncResearchPipeline.__new__(AsyncResearchPipeline)
+    pipeline.engine = engine
+    pipeline.qdrant = ThreadedQdrant(engine.qdrant)
+    pipeline.executor = ThreadPoolExecutor(max_workers=4)
+    yield pipeline
+    pipeline.executor.shutdown()
+    client.close()
+
+
+def test_parallel_jobs_store_each_paper_once(pipeline):
+    # Sliding windows over 40 papers: neighbouring jobs share most of
+    # their papers, and every third job sees second versions
+    jobs = [
+        [paper(number, version=2 if job % 3 == 0 else 1) for number in range(job * 5, job * 5 + 15)]
+        for job in range(6)
+    ]
+    unique = {canonical_arxiv_id(doc['arxiv_id']) for job in jobs for doc in job}
+
+    async def run():
+        await asyncio.gather(*(pipeline.store_in_qdrant(job) for job in jobs))
+        # Repeating every job changes nothing
+        await asyncio.gather(*(pipeline.store_in_qdrant(job) for job in jobs))
+
+    asyncio.run(run())
+
+    client = pipeline.engine.qdrant
+    assert client.count("research_docs", exact=True).count == len(unique)
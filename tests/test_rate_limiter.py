@@ -0,0 +1,58 @@
+"""
+Cancelled limiter waits give their reservation back without letting a
+later caller start alongside one that is still waiting
+"""
+import time
+import asyncio
+
+from app.rate_limiter import TokenBucket
+
+INTERVAL = 0.1
+# Slack for event loop scheduling
+TOLERANCE = 0.03
+
+
+def test_cancelled_waits_are_refunded():
+    bucket = TokenBucket(rate=1.0 / INTERVAL)
+
+    async def run():
+        await bucket.acquire_async()
+        waiters = [asyncio.create_task(bucket.acquire_async()) for _ in range(19)]
+        await asyncio.sleep(0)
+        # Newest first, as iter_arxiv_pages cancels its lookahead
+        for waiter in reversed(waiters):
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        started = time.monotonic()
+        await bucket.acquire_async()
+        return time.monotonic() - started
+
+    # Without refunds the 19 cancelled waits would hold the bucket for 1.9s
+    assert asyncio.run(run()) <= INTERVAL + TOLERANCE
+
+
+def test_refunds_keep_the_spacing():
+    bucket = TokenBucket(rate=1.0 / INTERVAL)
+
+    async def run():
+        finished = {}
+
+        async def acquire(name: str):
+            await bucket.acquire_async()
+            finished[name] = time.monotonic()
+
+        await acquire('first')
+        early = asyncio.create_task(acquire('early'))
+        later = asyncio.create_task(acquire('later'))
+        await asyncio.sleep(0)
+        # Not the latest reservation: 'later' still counts on it
+        early.cancel()
+        await asyncio.gather(early, return_exceptions=True)
+        await asyncio.gather(later, acquire('next'))
+        return finished
+
+    finished = asyncio.run(run())
+
+    assert 'early' not in finished
+    assert finished['next'] - finished['later'] >= INTERVAL - TOLERANCE
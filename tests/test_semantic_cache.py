@@ -0,0 +1,71 @@
+"""
+The semantic cache index follows its SQLite table without reloading it
+Entries are added and evicted in place; rows written by other processes
+sharing the database are picked up on the next lookup
+"""
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.semantic_cache import SemanticQueryCache
+
+DIMENSIONS = 8
+
+
+def vector(number: int) -> np.ndarray:
+    """Orthogonal unit vectors, so only the same number matches"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    vector[number % DIMENSIONS] = 1.0
+    return vector
+
+
+def result(number: int) -> dict:
+    return {'status': 'success', 'report': f"Report {number}"}
+
+
+def test_other_process_entries_are_found(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    writer = SemanticQueryCache(path)
+    reader = SemanticQueryCache(path)
+
+    assert reader.lookup("query 1", vector(1)) is None
+    writer.put("query 1", vector(1), result(1), 12.0)
+
+    hit = reader.lookup("reworded query 1", vector(1))
+    assert hit.query == "query 1"
+    assert hit.result == result(1)
+    assert reader.stats()['entries'] == 1
+
+
+def test_eviction_keeps_the_newest_entries(tmp_path):
+    cache = SemanticQueryCache(str(tmp_path / "queries.sqlite"), max_entries=3)
+    for number in range(DIMENSIONS):
+        cache.put(f"query {number}", vector(number), result(number), 1.0)
+    # Storing a query again replaces its entry
+    cache.put("query 7", vector(7), result(70), 1.0)
+
+    assert cache.stats()['entries'] == 3
+    assert cache.lookup("query 4", vector(4)) is None
+    assert cache.lookup("query 5", vector(5)).result == result(5)
+    assert cache.lookup("query 7", vector(7)).result == result(70)
+    assert sorted(cache._queries) == ["query 5", "query 6", "query 7"]
+
+
+def test_tables_without_ids_are_migrated(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE queries (query TEXT PRIMARY KEY, vector BLOB NOT NULL, result TEXT NOT NULL, "
+        "research_seconds REAL NOT NULL, created_at REAL NOT NULL)"
+    )
+    db.execute(
+        "INSERT INTO queries VALUES (?, ?, ?, ?, strftime('%s', 'now'))",
+        ("query 2", vector(2).tobytes(), '{"report": "Report 2"}', 3.0)
+    )
+    db.commit()
+    db.close()
+
+    cache = SemanticQueryCache(path)
+    assert cache.lookup("query 2", vector(2)).result == {'report': "Report 2"}
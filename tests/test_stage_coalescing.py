@@ -0,0 +1,144 @@
+"""
+Runs of one query with different filters share their pipeline stages
+The whole-job flight only joins identical runs (same query and filters);
+the fetch stage is shared by runs of the same query, and the generate
+stage by runs that retrieved the same papers, whose jobs all receive the
+streamed report text
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("qdrant_client")
+pytest.importorskip("fastembed")
+
+import app.async_pipeline as async_pipeline
+from app.async_pipeline import AsyncResearchPipeline
+from app.progress import ProgressBroker
+from app.query_utils import research_key
+from app.single_flight import AsyncSingleFlight
+
+QUERY = "retrieval augmented generation"
+FILTERS = [{'categories': ['cs.CL']}, {'categories': ['cs.IR']}]
+REPORT_PARTS = ["Recent work ", "reranks passages ", "[1]."]
+
+
+def paper(number: int) -> dict:
+    return {
+        'title': f"Paper {number}",
+        'content': f"Abstract of paper {number}.",
+        'url': f"http://arxiv.org/abs/2401.{number:05d}v1",
+        'published_date': '2024-01-15',
+        'arxiv_id': f"2401.{number:05d}v1"
+    }
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    flight = AsyncSingleFlight()
+    monkeypatch.setattr(async_pipeline, "async_research_flight", flight)
+    return flight
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = ProgressBroker()
+    monkeypatch.setattr(async_pipeline, "progress_broker", broker)
+    return broker
+
+
+@pytest.fixture
+def pipeline():
+    """Pipeline whose stages are fakes; every filter matches the same papers"""
+    engine = SimpleNamespace(
+        arxiv_max_results=20,
+        retrieval_mode="qdrant",
+        report_top_k=4,
+        report_sources=4,
+        groq_model="fake-model",
+        encoder=SimpleNamespace(seconds_per_text=lambda: 0.02)
+    )
+    pipeline = AsyncResearchPipeline.__new__(AsyncResearchPipeline)
+    pipeline.engine = engine
+    pipeline._generations = {}
+    pipeline.calls = {'fetch': 0, 'generate': 0}
+
+    async def embed(texts):
+        # Every text is an embedding cache hit
+        usage = async_pipeline._embedding_usage.get()
+        usage['hits'] = usage.get('hits', 0) + len(texts)
+        return [[0.0] for _ in texts]
+
+    async def fetch_and_store(query):
+        pipeline.calls['fetch'] += 1
+        await asyncio.sleep(0.05)
+        return [paper(number) for number in range(8)]
+
+    async def search(query, top_k=12, filters=None):
+        return [paper(number) for number in range(top_k)]
+
+    async def generate_report(query, documents, on_text=None, priority=0):
+        pipeline.calls['generate'] += 1
+        for part in REPORT_PARTS:
+            await asyncio.sleep(0.05)
+            on_text(part)
+        return "".join(REPORT_PARTS), {'first_token': 0.05, 'complete': True}
+
+    pipeline._embed = embed
+    pipeline._fetch_and_store = fetch_and_store
+    pipeline.search_relevant_docs = search
+    pipeline._generate_report = generate_report
+    return pipeline
+
+
+def test_filtered_runs_share_fetch_and_generation(pipeline, flight, broker):
+    for index, filters in enumerate(FILTERS):
+        broker.attach(f"job-{index}", research_key(QUERY, filters))
+
+    async def run():
+        return await asyncio.gather(*(pipeline.run_full_research(QUERY, filters) for filters in FILTERS))
+
+    results = asyncio.run(run())
+
+    assert [result['report'] for result in results] == ["".join(REPORT_PARTS)] * 2
+    assert pipeline.calls == {'fetch': 1, 'generate': 1}
+    stats = flight.stats()
+    assert stats['fetch'] == {'executed': 1, 'coalesced': 1}
+    assert stats['generate'] == {'executed': 1, 'coalesced': 1}
+    assert stats['in_flight'] == 0
+    assert pipeline._generations == {}
+    assert [result['embedding'] for result in results] == [{
+        'hits': 1, 'embedded': 0, 'hit_rate': 1.0, 'embed_seconds': 0.0, 'seconds_saved': 0.02
+    }] * 2
+
+    # Both jobs stream the whole report, not only the leading run's job
+    for index in range(len(FILTERS)):
+        streamed = "".join(data['text'] for event, data in broker._history[f"job-{index}"] if event == 'report_delta')
+        assert streamed == "".join(REPORT_PARTS)
+
+
+def test_late_run_receives_the_text_so_far(pipeline, flight, broker):
+    broker.attach("early", research_key(QUERY, FILTERS[0]))
+    broker.attach("late", research_key(QUERY, FILTERS[1]))
+    documents = [paper(number) for number in range(4)]
+    key = ('generate', QUERY, "fake-model", tuple(doc['arxiv_id'] for doc in documents))
+
+    async def run():
+        early = asyncio.create_task(
+            pipeline._shared_generation(key, research_key(QUERY, FILTERS[0]), QUERY, documents, 0)
+        )
+        # Join after two of the three parts have streamed
+        await asyncio.sleep(0.12)
+        late = await pipeline._shared_generation(key, research_key(QUERY, FILTERS[1]), QUERY, documents, 0)
+        return await early, late
+
+    early, late = asyncio.run(run())
+
+    assert early == late
+    assert pipeline.calls['generate'] == 1
+    streamed = [data['text'] for event, data in broker._history["late"] if event == 'report_delta']
+    assert "".join(streamed) == "".join(REPORT_PARTS)
+    # The text generated before joining arrives as one piece
+    assert streamed == ["".join(REPORT_PARTS[:2]), REPORT_PARTS[2]]